@@ -0,0 +1,40 @@
+# gunicorn.conf.py
+# Production serving profile: `gunicorn -c gunicorn.conf.py`.
+# Reload code gracefully with `kill -HUP <master pid>`: new workers are
+# started before the old ones finish their in-flight requests.
+import multiprocessing
+import os
+
+# Sync WSGI workers by default: nearly every endpoint is a sync DRF view,
+# which an ASGI worker runs one at a time, and they measured fastest in
+# the serving benchmarks. Set GUNICORN_WORKER_CLASS=gthread for threaded
+# workers or uvicorn_worker.UvicornWorker to serve the ASGI application.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+asgi = 'uvicorn' in worker_class.lower()
+wsgi_app = 'inventoryms.asgi:application' if asgi else 'inventoryms.wsgi:application'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# An event-loop worker keeps a core busy on its own; blocking workers spend
+# part of each request waiting on the database, so they get twice the cores.
+cores = multiprocessing.cpu_count()
+workers = int(os.getenv('GUNICORN_WORKERS', cores if asgi else cores * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers periodically to bound memory growth; the jitter keeps
+# them from restarting all at once.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+if asgi:
+    # Under ASGI each request's sync code runs in its own thread, so
+    # persistent database connections would pile up instead of being
+    # reused (see Django's ASGI deployment notes).
+    os.environ.setdefault('POSTGRES_CONN_MAX_AGE', '0')
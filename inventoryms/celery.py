@@ -1,10 +1,64 @@
 # myproject/celery.py
 from __future__ import absolute_import, unicode_literals
 import os
+import time
 from celery import Celery
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventoryms.settings')
 
 app = Celery('inventoryms')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Message header carrying the time a task was published, used to measure how
+# long it waited in the queue.
+PUBLISHED_AT_HEADER = 'published_at'
+
+# Tasks returning ``{'processed': rows, 'errors': [...]}`` for a CSV they
+# imported themselves.
+IMPORT_TASKS = {'products.tasks.import_csv_file', 'products.tasks.process_csv_file'}
+
+# Start times of the tasks running in this worker process, by task id.
+_started = {}
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    from products import metrics
+
+    _started[task_id] = time.perf_counter()
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is not None:
+        metrics.TASK_QUEUE_WAIT.observe(task.name, max(0.0, time.time() - float(published_at)))
+
+
+@task_postrun.connect
+def record_task_end(task_id=None, task=None, retval=None, state=None, **kwargs):
+    from products import metrics
+
+    started = _started.pop(task_id, None)
+    metrics.TASK_RUNS.inc(task.name)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    metrics.TASK_DURATION.observe(task.name, duration)
+
+    if task.name in IMPORT_TASKS and state == 'SUCCESS' and isinstance(retval, dict):
+        metrics.TASK_ROWS.inc(task.name, retval.get('processed', 0))
+        metrics.TASK_ROW_ERRORS.inc(task.name, len(retval.get('errors', [])))
+        if duration > 0:
+            metrics.TASK_ROWS_PER_SECOND.observe(task.name, retval.get('processed', 0) / duration)
+
+
+@task_failure.connect
+def record_task_failure(sender=None, **kwargs):
+    from products import metrics
+
+    metrics.TASK_FAILURES.inc(sender.name)
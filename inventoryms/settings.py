@@ -44,7 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'products.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'products.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,6 +92,41 @@ DATABASES = {
     )
 }
 
+# Cache
+# Redis (the instance Celery uses) when REDIS_URL is set, local memory otherwise.
+
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'ims',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 300))
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'products.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Share of requests instrumented by PerformanceMiddleware (0 to 1).
+PERF_SAMPLE_RATE = float(os.getenv('PERF_SAMPLE_RATE', 0.1))
+# Views left out of the request histograms.
+PERF_EXCLUDED_VIEWS = ['metrics']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -123,6 +160,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Static files are compressed and given hashed names at collectstatic time
+# and served by WhiteNoise with far-future cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -135,6 +184,65 @@ CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Tune from the task metrics (`manage.py task_metrics` or /metrics/).
+CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY', os.cpu_count() or 1))
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', 4))
+CELERY_BEAT_SCHEDULE = {
+    'send-low-stock-digest': {
+        'task': 'products.tasks.send_low_stock_digest',
+        'schedule': int(os.getenv('LOW_STOCK_DIGEST_INTERVAL', 15 * 60)),
+    },
+    'prune-tombstones': {
+        'task': 'products.tasks.prune_tombstones',
+        'schedule': 24 * 60 * 60,
+    },
+    'take-stock-snapshots': {
+        'task': 'products.tasks.take_stock_snapshots',
+        'schedule': int(os.getenv('STOCK_SNAPSHOT_INTERVAL', 60 * 60)),
+    },
+    'compact-stock-ledger': {
+        'task': 'products.tasks.compact_stock_ledger',
+        'schedule': 24 * 60 * 60,
+    },
+    'refresh-supplier-summaries': {
+        'task': 'products.tasks.refresh_supplier_summaries',
+        'schedule': int(os.getenv('SUPPLIER_SUMMARY_REFRESH_INTERVAL', 60)),
+    },
+    # Catches changes made outside the ORM, which never mark summaries stale.
+    'rebuild-supplier-summaries': {
+        'task': 'products.tasks.refresh_supplier_summaries',
+        'schedule': 24 * 60 * 60,
+        'kwargs': {'full': True},
+    },
+}
+CSV_IMPORT_SPOOL_DIR = os.getenv('CSV_IMPORT_SPOOL_DIR', BASE_DIR / 'spool')
+CSV_IMPORT_CHUNK_SIZE = int(os.getenv('CSV_IMPORT_CHUNK_SIZE', 2000))
+CSV_IMPORT_SHARD_SIZE = int(os.getenv('CSV_IMPORT_SHARD_SIZE', 16 * 1024 * 1024))
+CSV_IMPORT_MAX_SHARDS = int(os.getenv('CSV_IMPORT_MAX_SHARDS', 8))
+INVENTORY_BULK_MAX_ITEMS = int(os.getenv('INVENTORY_BULK_MAX_ITEMS', 10000))
+INVENTORY_BULK_BATCH_SIZE = int(os.getenv('INVENTORY_BULK_BATCH_SIZE', 500))
+CATALOG_BULK_MAX_ITEMS = int(os.getenv('CATALOG_BULK_MAX_ITEMS', 10000))
+CATALOG_BULK_BATCH_SIZE = int(os.getenv('CATALOG_BULK_BATCH_SIZE', 1000))
+LOW_STOCK_ALERT_WINDOW = int(os.getenv('LOW_STOCK_ALERT_WINDOW', 24 * 60 * 60))
+LOW_STOCK_DIGEST_MAX_ITEMS = int(os.getenv('LOW_STOCK_DIGEST_MAX_ITEMS', 5000))
+LOW_STOCK_ALERT_RECIPIENTS = ['t.solesi@fusioncl.com']
+# Change feeds only return changes stamped this many seconds before the
+# oldest open write transaction began (PostgreSQL) or before now (other
+# databases), so rows written by transactions still open when a feed is
+# read are not skipped. On PostgreSQL this covers clock skew between app
+# servers and the database; elsewhere it must outlast the longest write
+# transaction, such as a bulk adjustment or an import chunk.
+CHANGE_FEED_SAFETY_WINDOW = int(os.getenv('CHANGE_FEED_SAFETY_WINDOW', 5))
+# Deletes are kept this long; older watermarks must resync from scratch.
+CHANGE_FEED_TOMBSTONE_RETENTION = int(os.getenv('CHANGE_FEED_TOMBSTONE_RETENTION', 30 * 24 * 60 * 60))
+STOCK_LEDGER_BATCH_SIZE = int(os.getenv('STOCK_LEDGER_BATCH_SIZE', 1000))
+# Snapshots only cover movements stamped this many seconds before the oldest
+# open write transaction began (PostgreSQL) or before now (other databases),
+# so movements written by transactions still open are not skipped.
+STOCK_SNAPSHOT_SAFETY_WINDOW = int(os.getenv('STOCK_SNAPSHOT_SAFETY_WINDOW', 60))
+# Stock can be reconstructed this far back; older history is compacted.
+STOCK_LEDGER_RETENTION = int(os.getenv('STOCK_LEDGER_RETENTION', 365 * 24 * 60 * 60))
+SUPPLIER_SUMMARY_BATCH_SIZE = int(os.getenv('SUPPLIER_SUMMARY_BATCH_SIZE', 200))
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'mail.fusionscl.com'
 EMAIL_USE_TLS = True
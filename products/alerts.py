@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LowStockAlert, Product, effective_reorder_point
+
+
+def record_low_stock(changes):
+    """
+    Record low stock events for a batch of inventory changes.
+
+    ``changes`` is an iterable of ``(product_id, previous_quantity, quantity)``
+    with ``previous_quantity`` set to ``None`` for new inventory rows. Only a
+    drop from at or above the product's reorder point to below it is an
+    event. Reorder points are looked up in one query for the whole batch,
+    and only for changes that lowered the quantity. Events are
+    coalesced per product: if the product already has an alert waiting for
+    the next digest, or was included in a digest in the last
+    ``LOW_STOCK_ALERT_WINDOW`` seconds, no new alert is created. Nothing is
+    sent here; ``send_low_stock_digest`` sends them.
+    """
+    lowered = {
+        product_id: (previous, quantity)
+        for product_id, previous, quantity in changes
+        if previous is None or quantity < previous
+    }
+    if not lowered:
+        return []
+
+    reorder_points = (
+        Product.objects.filter(id__in=lowered)
+        .annotate(threshold=effective_reorder_point())
+        .values_list('id', 'threshold')
+    )
+    crossed = {}
+    for product_id, threshold in reorder_points:
+        previous, quantity = lowered[product_id]
+        if quantity < threshold and (previous is None or previous >= threshold):
+            crossed[product_id] = (quantity, threshold)
+
+    if not crossed:
+        return []
+
+    window_start = timezone.now() - timedelta(seconds=settings.LOW_STOCK_ALERT_WINDOW)
+    covered = set(
+        LowStockAlert.objects.filter(product_id__in=crossed)
+        .filter(Q(sent_at__isnull=True) | Q(sent_at__gte=window_start))
+        .values_list('product_id', flat=True)
+    )
+    return LowStockAlert.objects.bulk_create([
+        LowStockAlert(product_id=product_id, quantity=quantity, threshold=threshold)
+        for product_id, (quantity, threshold) in crossed.items()
+        if product_id not in covered
+    ])
@@ -0,0 +1,145 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+
+from . import cache as api_cache
+from .filters import StableOrderingFilter, apply_filters, parse_integer
+from .middleware import serialization_timer
+from .models import Inventory, Product
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .projections import INVENTORY_PROJECTION, PRODUCT_PROJECTION
+from .renderers import FastJSONRenderer
+from .serializers import InventorySerializer, ProductSerializer
+from .views import InventoryView, ProductListCreateAPIView
+
+
+class JSONErrorResponse(Exception):
+    """Stop a view with an error payload in the sync views' ``{'error': ...}`` shape."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.data = {'error': message}
+        self.status_code = status_code
+
+
+def json_view(view):
+    """
+    Wrap an async view that returns serializable data, rendering it with
+    the DRF views' JSON renderer so the output matches byte for byte.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            data = await view(Request(request), *args, **kwargs)
+            status_code = status.HTTP_200_OK
+        except JSONErrorResponse as e:
+            data, status_code = e.data, e.status_code
+        except APIException as e:
+            data, status_code = {'detail': e.detail}, e.status_code
+        except Exception as e:
+            data = {'error': 'An unexpected error occurred: ' + str(e)}
+            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        with serialization_timer(request):
+            content = FastJSONRenderer().render(data)
+        return HttpResponse(content, status=status_code, content_type='application/json')
+
+    return require_GET(wrapper)
+
+
+async def cached_payload(key, build):
+    data = await sync_to_async(api_cache.get_payload)(key)
+    if data is None:
+        data = await build()
+        await sync_to_async(api_cache.set_payload)(key, data)
+    return data
+
+
+def filtered_queryset(queryset, request, view, ordered=True):
+    """
+    ``queryset`` narrowed by the sync ``view``'s ``query_filters`` and, if
+    ``ordered``, sorted by its ``ordering_fields``, so both serve the same
+    rows in the same order.
+    """
+    try:
+        queryset = apply_filters(queryset, request.query_params, view.query_filters)
+    except ValueError as e:
+        raise JSONErrorResponse(str(e), status.HTTP_400_BAD_REQUEST)
+    if ordered:
+        queryset = StableOrderingFilter().filter_queryset(request, queryset, view)
+    return queryset
+
+
+async def paginated_payload(paginator, queryset, request, projection):
+    try:
+        projection = projection.for_request(request, keep=getattr(paginator, 'position_fields', ()))
+    except ValueError as e:
+        raise JSONErrorResponse(str(e), status.HTTP_400_BAD_REQUEST)
+    page = await paginator.apaginate_queryset(projection.queryset(queryset), request)
+    with serialization_timer(request):
+        return paginator.get_paginated_response(projection.serialize(page)).data
+
+
+@json_view
+async def product_list(request):
+    async def build():
+        queryset = filtered_queryset(Product.objects.select_related('supplier'), request, ProductListCreateAPIView)
+        return await paginated_payload(StandardResultsSetPagination(), queryset, request, PRODUCT_PROJECTION)
+
+    key = await sync_to_async(api_cache.list_key)('product', request)
+    return await cached_payload(key, build)
+
+
+@json_view
+async def product_detail(request, pk):
+    async def build():
+        try:
+            product = await Product.objects.select_related('supplier').aget(pk=pk)
+        except Product.DoesNotExist:
+            raise NotFound('No Product matches the given query.')
+        with serialization_timer(request):
+            return ProductSerializer(product).data
+
+    key = await sync_to_async(api_cache.detail_key)('product', pk)
+    return await cached_payload(key, build)
+
+
+@json_view
+async def inventory(request):
+    product_id = request.query_params.get('product_id')
+
+    if product_id:
+        try:
+            product_id = parse_integer(product_id)
+        except ValueError:
+            raise JSONErrorResponse(f'Invalid product_id: {product_id}', status.HTTP_400_BAD_REQUEST)
+
+        async def build():
+            try:
+                item = await Inventory.objects.select_related('product__supplier').aget(product_id=product_id)
+            except Inventory.DoesNotExist:
+                if not await Product.objects.filter(id=product_id).aexists():
+                    raise JSONErrorResponse('Product not found', status.HTTP_404_NOT_FOUND)
+                raise JSONErrorResponse('Inventory not found for this product', status.HTTP_404_NOT_FOUND)
+            with serialization_timer(request):
+                return InventorySerializer(item).data
+
+        key = await sync_to_async(api_cache.detail_key)('inventory', product_id)
+        return await cached_payload(key, build)
+
+    async def build():
+        # Cursors walk in their own (updated_at, id) order.
+        walk = KeysetPagination.cursor_query_param in request.query_params
+        queryset = filtered_queryset(
+            Inventory.objects.select_related('product__supplier'), request, InventoryView, ordered=not walk
+        )
+        paginator = KeysetPagination() if walk else StandardResultsSetPagination()
+        return await paginated_payload(paginator, queryset, request, INVENTORY_PROJECTION)
+
+    key = await sync_to_async(api_cache.list_key)('inventory', request)
+    return await cached_payload(key, build)
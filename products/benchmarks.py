@@ -0,0 +1,336 @@
+import http.client
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from . import changes, synthetic
+from .models import Inventory, Product, Supplier
+from .pagination import StandardResultsSetPagination
+from .projections import INVENTORY_PROJECTION, PRODUCT_PROJECTION
+from .renderers import FastJSONRenderer
+from .serializers import InventorySerializer, ProductSerializer
+from .tasks import process_csv_file
+
+# Endpoints measured by the suite. Each builder gets a random generator and
+# the catalogue (sizes and sampled ids) and returns the path to request.
+ENDPOINTS = {
+    'product-list': lambda rng, ids: f"{reverse('product-list-create')}?page={_page(rng, ids['products'])}",
+    'product-detail': lambda rng, ids: reverse('product-detail', args=[rng.choice(ids['product_ids'])]),
+    'product-search': lambda rng, ids: f"{reverse('product-search')}?q=product+{rng.randrange(ids['products'])}",
+    'supplier-list': lambda rng, ids: f"{reverse('supplier-list-create')}?page={_page(rng, ids['suppliers'])}",
+    'supplier-detail': lambda rng, ids: reverse('supplier-detail', args=[rng.choice(ids['supplier_ids'])]),
+    'inventory-list': lambda rng, ids: f"{reverse('inventory-update')}?page={_page(rng, ids['products'])}",
+    'inventory-detail': lambda rng, ids: f"{reverse('inventory-update')}?product_id={rng.choice(ids['product_ids'])}",
+    'inventory-list-sparse': lambda rng, ids: (
+        f"{reverse('inventory-update')}?page={_page(rng, ids['products'])}&fields=id,quantity,product.name"
+    ),
+    'inventory-changes': lambda rng, ids: f"{reverse('inventory-changes')}?since={ids['inventory_watermark']}",
+    'inventory-reorder': lambda rng, ids: reverse('inventory-reorder'),
+    'async-product-list': lambda rng, ids: f"{reverse('async-product-list')}?page={_page(rng, ids['products'])}",
+    'async-product-detail': lambda rng, ids: reverse('async-product-detail', args=[rng.choice(ids['product_ids'])]),
+    'async-inventory-detail': lambda rng, ids: f"{reverse('async-inventory')}?product_id={rng.choice(ids['product_ids'])}",
+}
+
+
+def _page(rng, row_count):
+    return rng.randint(1, max(1, math.ceil(row_count / StandardResultsSetPagination.page_size)))
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries run inside the block without keeping their SQL, so
+    imports of millions of rows can be measured.
+    """
+    counter = {'queries': 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(timings_ms):
+    timings_ms = sorted(timings_ms)
+    return {
+        'count': len(timings_ms),
+        'mean_ms': round(statistics.mean(timings_ms), 3) if timings_ms else None,
+        'p50_ms': _round(percentile(timings_ms, 0.50)),
+        'p95_ms': _round(percentile(timings_ms, 0.95)),
+        'p99_ms': _round(percentile(timings_ms, 0.99)),
+        'max_ms': _round(timings_ms[-1] if timings_ms else None),
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def catalogue_size():
+    """Sizes of the synthetic catalogue in the database."""
+    return {
+        'suppliers': Supplier.objects.filter(name__startswith=synthetic.SUPPLIER_NAME.format('')).count(),
+        'products': Product.objects.filter(name__startswith=synthetic.PRODUCT_NAME.format('')).count(),
+    }
+
+
+def sample_ids(model, count, rng):
+    """Up to ``count`` random primary keys of ``model`` without ``ORDER BY RANDOM()``."""
+    queryset = model.objects.order_by('id').values_list('id', flat=True)
+    first, last = queryset.first(), queryset.last()
+    if first is None:
+        return []
+    wanted = {rng.randint(first, last) for _ in range(count)}
+    ids = sorted(model.objects.filter(id__in=wanted).values_list('id', flat=True))
+    return ids or [first]
+
+
+def catalogue_ids(size, count, rng):
+    """What the endpoint builders need: sizes, sampled ids and a sync watermark."""
+    ids = dict(size)
+    ids['product_ids'] = sample_ids(Product, count, rng)
+    ids['supplier_ids'] = sample_ids(Supplier, count, rng)
+    # A client that is up to date, the common case for a delta sync.
+    ids['inventory_watermark'] = changes.latest_watermark('inventory')
+    return ids
+
+
+def benchmark_import(rows, size, seed=0):
+    """
+    Import a synthetic feed of ``rows`` rows with ``process_csv_file`` and
+    report its throughput. The import is rolled back afterwards so repeated
+    runs start from the same data.
+    """
+    spool_dir = settings.CSV_IMPORT_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        'w', dir=spool_dir, suffix='.csv', newline='', encoding='utf-8', delete=False
+    ) as csv_file:
+        synthetic.write_csv(csv_file, rows, size['suppliers'], size['products'], seed=seed)
+
+    with transaction.atomic():
+        with count_queries() as counter:
+            started = time.perf_counter()
+            results = process_csv_file(csv_file.name)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+
+    return {
+        'rows': rows,
+        'processed': results['processed'],
+        'errors': len(results['errors']),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(results['processed'] / elapsed, 1) if elapsed else None,
+        'queries': counter['queries'],
+    }
+
+
+def benchmark_endpoints(client, requests, size, seed=0, before_request=None):
+    """
+    Request every endpoint in :data:`ENDPOINTS` ``requests`` times and
+    report latency percentiles and queries per request.
+    """
+    rng = random.Random(seed)
+    ids = catalogue_ids(size, requests, rng)
+
+    report = {}
+    for name, build in ENDPOINTS.items():
+        timings = []
+        queries = []
+        statuses = {}
+        for _ in range(requests):
+            path = build(rng, ids)
+            if before_request is not None:
+                before_request()
+            with count_queries() as counter:
+                started = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter['queries'])
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        report[name] = {
+            **summarize(timings),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
+    return report
+
+
+def benchmark_http(base_url, requests, concurrency, size, seed=0):
+    """
+    Load a running server at ``base_url`` with ``concurrency`` keep-alive
+    clients, each sending ``requests`` requests spread over
+    :data:`ENDPOINTS`, and report throughput and latency percentiles.
+    Meant for comparing serving setups (runserver, gunicorn workers)
+    against the same database.
+    """
+    rng = random.Random(seed)
+    ids = catalogue_ids(size, requests, rng)
+    names = list(ENDPOINTS)
+    plans = [
+        [(name, ENDPOINTS[name](rng, ids)) for name in rng.choices(names, k=requests)]
+        for _ in range(concurrency)
+    ]
+
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+
+    def get(client, path):
+        client.request('GET', prefix + path)
+        response = client.getresponse()
+        response.read()
+        return response.status
+
+    def run(plan):
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        client = connection_class(url.netloc, timeout=60)
+        results = []
+        try:
+            for name, path in plan:
+                started = time.perf_counter()
+                try:
+                    try:
+                        status_code = get(client, path)
+                    except (ConnectionError, http.client.RemoteDisconnected):
+                        # The server closed an idle keep-alive connection or
+                        # recycled its worker; retry once on a new one, as
+                        # HTTP clients do for idempotent requests.
+                        client.close()
+                        status_code = get(client, path)
+                except (OSError, http.client.HTTPException):
+                    client.close()
+                    status_code = None
+                results.append((name, (time.perf_counter() - started) * 1000, status_code))
+        finally:
+            client.close()
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = [result for plan_results in executor.map(run, plans) for result in plan_results]
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'url': base_url,
+        'concurrency': concurrency,
+        'requests': len(results),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(results) / elapsed, 1) if elapsed else None,
+        'errors': sum(1 for _, _, status_code in results if status_code is None or status_code >= 500),
+        **summarize([timing for _, timing, _ in results]),
+        'endpoints': {},
+    }
+    for name in names:
+        timings = [timing for result_name, timing, _ in results if result_name == name]
+        if timings:
+            report['endpoints'][name] = summarize(timings)
+    return report
+
+
+# Page querysets and the two ways of rendering them compared by
+# benchmark_serialization: (name, queryset, serializer, projection).
+SERIALIZATION_CASES = [
+    ('product', lambda: Product.objects.select_related('supplier').order_by('id'),
+     ProductSerializer, PRODUCT_PROJECTION),
+    ('inventory', lambda: Inventory.objects.select_related('product__supplier').order_by('id'),
+     InventorySerializer, INVENTORY_PROJECTION),
+]
+
+
+def benchmark_serialization(page_size, repeat):
+    """
+    Time fetching and rendering one page of ``page_size`` rows as JSON
+    with the model serializers and with the ``values()`` projections, and
+    check that both produce the same bytes.
+    """
+    report = {}
+    for name, queryset, serializer_class, projection in SERIALIZATION_CASES:
+        def with_serializer():
+            rows = list(queryset()[:page_size])
+            return JSONRenderer().render(serializer_class(rows, many=True).data)
+
+        def with_projection():
+            rows = list(projection.queryset(queryset())[:page_size])
+            return FastJSONRenderer().render(projection.serialize(rows))
+
+        timings = {'serializer': [], 'projection': []}
+        for _ in range(repeat):
+            for label, render in (('serializer', with_serializer), ('projection', with_projection)):
+                started = time.perf_counter()
+                render()
+                timings[label].append((time.perf_counter() - started) * 1000)
+
+        serializer_summary = summarize(timings['serializer'])
+        projection_summary = summarize(timings['projection'])
+        report[name] = {
+            'page_size': page_size,
+            'identical': with_serializer() == with_projection(),
+            'serializer': serializer_summary,
+            'projection': projection_summary,
+            'p50_ms': projection_summary['p50_ms'],
+            'p95_ms': projection_summary['p95_ms'],
+            'speedup': round(serializer_summary['p50_ms'] / projection_summary['p50_ms'], 2)
+            if projection_summary['p50_ms'] else None,
+        }
+    return report
+
+
+# Metrics compared between runs, and whether a higher value is better.
+COMPARED_METRICS = {
+    'rows_per_second': True,
+    'requests_per_second': True,
+    'queries': False,
+    'p50_ms': False,
+    'p95_ms': False,
+    'queries_max': False,
+}
+
+
+def compare(baseline, current):
+    """
+    Yield ``(section, metric, baseline, current, change)`` for every metric
+    both runs recorded, where ``change`` is the relative change, positive
+    when ``current`` is better.
+    """
+    sections = [
+        ('import', baseline.get('import'), current.get('import')),
+        ('http', baseline.get('http'), current.get('http')),
+    ]
+    for group in ('endpoints', 'serialization'):
+        for name, result in current.get(group, {}).items():
+            sections.append((name, baseline.get(group, {}).get(name), result))
+
+    for section, before, after in sections:
+        if not before or not after:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            if old:
+                change = (new - old) / old if higher_is_better else (old - new) / old
+            else:
+                change = 0.0 if new == old else None
+            yield section, metric, old, new, change
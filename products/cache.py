@@ -0,0 +1,141 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Cached payloads embed related objects: products embed their supplier and
+# inventory embeds its product and supplier. A change to a resource therefore
+# also makes these resources' payloads stale.
+DEPENDENTS = {
+    'supplier': ('product', 'inventory'),
+    'product': ('inventory',),
+    'inventory': (),
+}
+
+HITS_KEY = 'api:stats:hits'
+MISSES_KEY = 'api:stats:misses'
+
+
+def _generation_key(resource):
+    return f'api:gen:{resource}'
+
+
+def _list_generation_key(resource):
+    return f'api:listgen:{resource}'
+
+
+def _version_key(resource, pk):
+    return f'api:ver:{resource}:{pk}'
+
+
+def _counters(keys):
+    """
+    Read version counters, seeding missing ones from the clock so a counter
+    that was evicted never reuses a number an older payload was stored under.
+    """
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def _bump_now_and_on_commit(keys):
+    # Bumping again after commit stops a request that read the old row
+    # before the commit from caching it under the new version.
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def detail_key(resource, pk):
+    generation, version = _counters([_generation_key(resource), _version_key(resource, pk)])
+    return f'api:{resource}:{pk}:{generation}:{version}'
+
+
+def list_key(resource, request):
+    generation, list_generation = _counters([_generation_key(resource), _list_generation_key(resource)])
+    query = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'api:{resource}:list:{generation}:{list_generation}:{query}'
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_entry(key):
+    """Return ``(payload, validators)`` cached under ``key``, or ``None``."""
+    entry = cache.get(key)
+    _count(HITS_KEY if entry is not None else MISSES_KEY)
+    return entry
+
+
+def get_payload(key):
+    entry = get_entry(key)
+    return entry[0] if entry is not None else None
+
+
+def set_payload(key, data, validators=None):
+    """
+    Cache ``data`` under ``key`` with the ETag/Last-Modified ``validators``
+    it was served with, if any. Keys change when the data does, so cached
+    validators stay valid as long as the payload does.
+    """
+    cache.set(key, (data, validators), settings.API_CACHE_TIMEOUT)
+
+
+def object_changed(resource, pk, related_pks=None):
+    """
+    Invalidate one object's payloads and every list of its resource.
+    ``related_pks`` maps dependent resources to the single object of that
+    resource that embeds this one (inventory rows are keyed by product id);
+    dependents not listed are invalidated wholesale.
+    """
+    related_pks = related_pks or {}
+    keys = [_version_key(resource, pk), _list_generation_key(resource)]
+    for dependent in DEPENDENTS[resource]:
+        if dependent in related_pks:
+            keys += [_version_key(dependent, related_pks[dependent]), _list_generation_key(dependent)]
+        else:
+            keys.append(_generation_key(dependent))
+    _bump_now_and_on_commit(keys)
+
+
+def resource_changed(*resources):
+    """Invalidate every cached payload of ``resources`` after a bulk write."""
+    keys = []
+    for resource in resources:
+        keys.append(_generation_key(resource))
+        keys += [_generation_key(dependent) for dependent in DEPENDENTS[resource]]
+    _bump_now_and_on_commit(keys)
+
+
+def rows_added(*resources):
+    """Invalidate the lists of ``resources`` after rows were bulk inserted."""
+    _bump_now_and_on_commit([_list_generation_key(resource) for resource in resources])
+
+
+def stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
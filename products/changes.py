@@ -0,0 +1,130 @@
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .conditional import modified_at
+from .models import Inventory, Product, Supplier, Tombstone
+from .pagination import seek
+from .projections import INVENTORY_PROJECTION, PRODUCT_PROJECTION, SUPPLIER_PROJECTION
+from .visibility import committed_cutoff
+
+# resource -> (model, projection of its rows)
+FEEDS = {
+    'supplier': (Supplier, SUPPLIER_PROJECTION),
+    'product': (Product, PRODUCT_PROJECTION),
+    'inventory': (Inventory, INVENTORY_PROJECTION),
+}
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+# Columns the rows must carry to advance the watermark. ``changed_at`` is
+# the latest updated_at of the row and the related rows it embeds, so a
+# supplier rename resends its products and their inventory.
+POSITION_FIELDS = ('changed_at', 'id')
+
+
+def _feed_rows(model, resource):
+    return model.objects.annotate(changed_at=modified_at(resource))
+
+
+class WatermarkExpired(Exception):
+    """The tombstones a watermark still needs have been pruned."""
+
+
+def encode_watermark(position, tombstone_id, issued_at):
+    updated_at, pk = position if position is not None else ('', 0)
+    if updated_at:
+        updated_at = updated_at.isoformat()
+    raw = f'{updated_at}|{pk}|{tombstone_id}|{issued_at.isoformat()}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_watermark(token):
+    """
+    Return ``(position, tombstone_id, issued_at)`` for a watermark token, or
+    raise ``ValueError``. ``position`` is ``None`` before the first row.
+    """
+    raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    updated_at, pk, tombstone_id, issued_at = raw.split('|')
+    issued_at = parse_datetime(issued_at)
+    if issued_at is None:
+        raise ValueError('Invalid timestamp')
+    if not updated_at:
+        return None, int(tombstone_id), issued_at
+    updated_at = parse_datetime(updated_at)
+    if updated_at is None:
+        raise ValueError('Invalid timestamp')
+    return (updated_at, int(pk)), int(tombstone_id), issued_at
+
+
+def changes_since(resource, token, page_size, projection=None):
+    """
+    Rows of ``resource`` created or updated since the watermark ``token``
+    and the ids of rows deleted since, with the token to send next time.
+
+    Rows are read in ``(changed_at, id)`` order by a keyset seek, where
+    ``changed_at`` is the latest ``updated_at`` of the row and of the rows
+    it embeds, and tombstones in id order, ``page_size`` of each at a
+    time; ``has_more`` says whether to ask again straight away.
+    Without a token the feed starts from the first row and skips the
+    tombstones of rows deleted before then.
+
+    Only changes stamped ``CHANGE_FEED_SAFETY_WINDOW`` seconds before the
+    oldest open write transaction began are returned (see
+    :func:`~products.visibility.committed_cutoff`), so a transaction that
+    was still open when the feed was read cannot commit a change behind
+    the watermark. Raises ``ValueError`` for a malformed token and
+    ``WatermarkExpired`` for one older than the tombstone retention.
+    """
+    model, default_projection = FEEDS[resource]
+    projection = (projection or default_projection).select(keep=POSITION_FIELDS)
+    now = timezone.now()
+    cutoff = committed_cutoff(settings.CHANGE_FEED_SAFETY_WINDOW, now)
+    tombstones = Tombstone.objects.filter(resource=resource, deleted_at__lte=cutoff)
+
+    if token:
+        position, tombstone_id, issued_at = decode_watermark(token)
+        if issued_at < now - timedelta(seconds=settings.CHANGE_FEED_TOMBSTONE_RETENTION):
+            raise WatermarkExpired
+    else:
+        position = None
+        tombstone_id = tombstones.aggregate(last=Max('id'))['last'] or 0
+
+    rows = projection.queryset(_feed_rows(model, resource).filter(changed_at__lte=cutoff))
+    rows = list(seek(rows, position, 'changed_at')[:page_size + 1])
+    deleted = list(
+        tombstones.filter(id__gt=tombstone_id).order_by('id').values_list('id', 'object_id')[:page_size + 1]
+    )
+    has_more = len(rows) > page_size or len(deleted) > page_size
+    rows, deleted = rows[:page_size], deleted[:page_size]
+
+    if rows:
+        position = tuple(rows[-1][field] for field in POSITION_FIELDS)
+    if deleted:
+        tombstone_id = deleted[-1][0]
+    return {
+        'changes': projection.serialize(rows),
+        'deleted': [object_id for _, object_id in deleted],
+        'watermark': encode_watermark(position, tombstone_id, now),
+        'has_more': has_more,
+    }
+
+
+def latest_watermark(resource):
+    """A watermark at the current end of ``resource``'s feed."""
+    model, _ = FEEDS[resource]
+    last = _feed_rows(model, resource).order_by('-changed_at', '-id').values_list(*POSITION_FIELDS).first()
+    tombstone_id = Tombstone.objects.filter(resource=resource).aggregate(last=Max('id'))['last'] or 0
+    return encode_watermark(last, tombstone_id, timezone.now())
+
+
+def prune_tombstones():
+    """Delete tombstones older than the retention; return how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_TOMBSTONE_RETENTION)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.pagination import PageNumberPagination
+
+# The updated_at columns behind each resource's payload, including the
+# related rows it embeds.
+MODIFIED_FIELDS = {
+    'supplier': ('updated_at',),
+    'product': ('updated_at', 'supplier__updated_at'),
+    'inventory': ('updated_at', 'product__updated_at', 'product__supplier__updated_at'),
+}
+
+
+def modified_at(resource):
+    """When a resource's payload last changed: the latest of its ``MODIFIED_FIELDS``."""
+    fields = MODIFIED_FIELDS[resource]
+    return Greatest(*fields) if len(fields) > 1 else F(fields[0])
+
+
+def _digest(*parts):
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def detail_validators(queryset, resource):
+    """
+    ``(etag, last_modified)`` for the single row of ``queryset``, from one
+    indexed query that reads only the updated_at columns, or ``None`` when
+    there is no such row.
+    """
+    row = queryset.values_list('pk', modified_at(resource)).first()
+    if row is None:
+        return None
+    pk, modified = row
+    return _digest(resource, pk, modified.isoformat()), int(modified.timestamp())
+
+
+def list_validators(request, queryset, resource, paginator=None):
+    """
+    ``(etag, None)`` for the page of ``queryset`` the request asks for: the
+    ids and updated_at of the rows on the page plus the total count, so
+    inserts and deletes that shift the page change it too. Lists carry no
+    ``Last-Modified``, since a delete does not move it forward.
+    """
+    if paginator is None:
+        pks, extent = None, None
+    else:
+        # Page over the bare ids so the count and the offset scan skip the
+        # joins, then read the updated_at columns of that page only.
+        pks = paginator.paginate_queryset(queryset.values_list('pk', flat=True), request)
+        extent = paginator.page.paginator.count if isinstance(paginator, PageNumberPagination) else paginator.has_next
+        queryset = queryset.filter(pk__in=pks)
+    modified = dict(queryset.values_list('pk', modified_at(resource)).order_by())
+    rows = [(pk, modified[pk].isoformat()) for pk in (pks if pks is not None else sorted(modified)) if pk in modified]
+    return _digest(resource, request.get_full_path(), extent, rows), None
+
+
+def _etag(request, validators):
+    # The same data rendered as JSON or as the browsable API is a different
+    # representation, so a strong ETag must differ.
+    digest, _ = validators
+    return f'"{digest}-{request.accepted_renderer.format}"'
+
+
+def not_modified(request, validators):
+    """A 304 response if the client's copy matches ``validators``, else ``None``."""
+    if validators is None:
+        return None
+    etag, last_modified = _etag(request, validators), validators[1]
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, request, validators)
+    return response
+
+
+def set_validators(response, request, validators):
+    if validators is None:
+        return
+    response['ETag'] = _etag(request, validators)
+    if validators[1] is not None:
+        response['Last-Modified'] = http_date(validators[1])
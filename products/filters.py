@@ -0,0 +1,91 @@
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+def parse_integer(value):
+    return int(value)
+
+
+def parse_decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+
+
+def parse_timestamp(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+# Query parameter -> (lookup, parser). Every lookup is served by an index:
+# supplier by (supplier, id), prices by (price, id), quantities by
+# (quantity, id) and updated_at windows by (updated_at, id).
+PRODUCT_FILTERS = {
+    'supplier_id': ('supplier_id', parse_integer),
+    'min_price': ('price__gte', parse_decimal),
+    'max_price': ('price__lte', parse_decimal),
+    'updated_after': ('updated_at__gte', parse_timestamp),
+    'updated_before': ('updated_at__lt', parse_timestamp),
+}
+INVENTORY_FILTERS = {
+    'supplier_id': ('product__supplier_id', parse_integer),
+    'min_quantity': ('quantity__gte', parse_integer),
+    'max_quantity': ('quantity__lte', parse_integer),
+    'updated_after': ('updated_at__gte', parse_timestamp),
+    'updated_before': ('updated_at__lt', parse_timestamp),
+}
+REORDER_FILTERS = {
+    'supplier_id': ('product__supplier_id', parse_integer),
+}
+
+
+def apply_filters(queryset, params, filters):
+    """
+    Filter ``queryset`` by the ``filters`` present in ``params``. Raises
+    ``ValueError`` naming the parameter when a value does not parse.
+    """
+    lookups = {}
+    for param, (lookup, parse) in filters.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            lookups[lookup] = parse(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid {param}: {value}')
+    return queryset.filter(**lookups) if lookups else queryset
+
+
+class QueryParamFilter(BaseFilterBackend):
+    """Apply the view's ``query_filters`` (see :func:`apply_filters`)."""
+
+    def filter_queryset(self, request, queryset, view):
+        try:
+            return apply_filters(queryset, request.query_params, view.query_filters)
+        except ValueError as e:
+            raise ParseError({'error': str(e)})
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    ``OrderingFilter`` restricted to the view's ``ordering_fields``, with
+    ``id`` appended as a tie-breaker so pages never overlap or skip rows.
+    The tie-breaker follows the direction of the first field so a
+    descending sort can walk its ``(field, id)`` index backwards.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
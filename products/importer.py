@@ -0,0 +1,347 @@
+import csv
+import logging
+import os
+import re
+import tempfile
+import zlib
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as api_cache
+from .models import Product, Inventory, Supplier
+from .signals import inventory_changed
+from .summaries import mark_stale_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Column added to shard files to carry the row number of the original upload.
+ROW_NUMBER_FIELD = '__row__'
+
+ROW_ERROR_RE = re.compile(r'Row (\d+):')
+
+ParsedRow = namedtuple('ParsedRow', [
+    'row_num', 'supplier_name', 'supplier_contact',
+    'product_name', 'description', 'price', 'quantity',
+])
+
+
+def spool_upload(uploaded_file):
+    """
+    Copy an uploaded file into the import spool directory chunk by chunk
+    and return its path, so only the path has to go through the broker.
+    """
+    os.makedirs(settings.CSV_IMPORT_SPOOL_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=settings.CSV_IMPORT_SPOOL_DIR, suffix='.csv', delete=False
+    ) as spool_file:
+        for chunk in uploaded_file.chunks():
+            spool_file.write(chunk)
+    return spool_file.name
+
+
+def iter_csv_rows(path, encoding='utf-8'):
+    """
+    Lazily yield ``(row_num, row)`` pairs from a CSV file on disk.
+
+    Shard files written by :func:`split_csv_file` carry the row number of
+    the original upload, which is used instead of the position in the shard.
+    """
+    with open(path, newline='', encoding=encoding) as csv_file:
+        reader = csv.DictReader(csv_file)
+        if reader.fieldnames and ROW_NUMBER_FIELD in reader.fieldnames:
+            for row in reader:
+                yield int(row.pop(ROW_NUMBER_FIELD)), row
+        else:
+            yield from enumerate(reader, start=1)
+
+
+def split_csv_file(path, shard_count, encoding='utf-8'):
+    """
+    Partition a CSV upload into ``shard_count`` shard files.
+
+    Rows are routed by a stable hash of ``(supplier_name, product_name)``, so
+    every product (and its inventory row) is handled by exactly one shard and
+    keeps its in-file order there. Suppliers can span shards, so they are all
+    created here, once, before any shard runs. Returns the shard paths; shard
+    files are UTF-8 regardless of the upload's encoding.
+    """
+    base, _ = os.path.splitext(path)
+    shard_paths = [f"{base}.shard{index}.csv" for index in range(shard_count)]
+    suppliers = {}
+
+    try:
+        _write_shards(path, shard_paths, suppliers, encoding)
+    except Exception:
+        for shard_path in shard_paths:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+        raise
+
+    for batch in _batched(list(suppliers.items()), settings.CSV_IMPORT_CHUNK_SIZE):
+        resolve_suppliers(dict(batch))
+    return shard_paths
+
+
+def _write_shards(path, shard_paths, suppliers, encoding):
+    shard_count = len(shard_paths)
+    with open(path, newline='', encoding=encoding) as csv_file:
+        reader = csv.DictReader(csv_file)
+        fieldnames = [ROW_NUMBER_FIELD] + list(reader.fieldnames or [])
+        with ExitStack() as stack:
+            writers = []
+            for shard_path in shard_paths:
+                shard_file = stack.enter_context(open(shard_path, 'w', newline='', encoding='utf-8'))
+                writer = csv.DictWriter(shard_file, fieldnames=fieldnames, extrasaction='ignore')
+                writer.writeheader()
+                writers.append(writer)
+
+            for row_num, row in enumerate(reader, start=1):
+                supplier_name = row.get('supplier_name')
+                product_name = row.get('product_name')
+                if supplier_name is not None:
+                    suppliers.setdefault(supplier_name, row.get('supplier_contact', '') or '')
+                key = f"{supplier_name}\x00{product_name}".encode('utf-8')
+                row[ROW_NUMBER_FIELD] = row_num
+                writers[zlib.crc32(key) % shard_count].writerow(row)
+
+
+def merge_results(shard_results):
+    """Combine per-shard result dicts, ordering errors by row number."""
+    results = {
+        'processed': 0,
+        'errors': []
+    }
+    for shard in shard_results:
+        results['processed'] += shard['processed']
+        results['errors'].extend(shard['errors'])
+    results['errors'].sort(key=_error_sort_key)
+    return results
+
+
+def _error_sort_key(message):
+    match = ROW_ERROR_RE.match(message)
+    return (1, int(match.group(1))) if match else (0, 0)
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def resolve_suppliers(wanted):
+    """
+    Map supplier names to ids, creating the missing ones.
+
+    ``wanted`` maps each name to the contact info used if it has to be
+    created. Inserts are ``ON CONFLICT`` upserts on the unique name, so a
+    supplier created concurrently by another import resolves to that row
+    instead of failing the chunk.
+    """
+    resolved = dict(Supplier.objects.filter(name__in=wanted).values_list('name', 'id'))
+
+    missing = [
+        Supplier(name=name, contact_info=contact)
+        for name, contact in wanted.items()
+        if name not in resolved
+    ]
+    created = Supplier.objects.bulk_create(
+        missing, update_conflicts=True, unique_fields=['name'], update_fields=['name']
+    )
+    for supplier in created:
+        resolved[supplier.name] = supplier.pk
+    if missing:
+        api_cache.rows_added('supplier')
+    return resolved
+
+
+def parse_row(row_num, row):
+    """Validate a raw CSV row the same way the per-row importer did."""
+    supplier_name = row['supplier_name']
+    supplier_contact = row.get('supplier_contact', '') or ''
+    product_name = row['product_name']
+    description = row.get('description', '') or ''
+    price = float(row['price'])
+    quantity = int(row['quantity']) if 'quantity' in row else None
+    return ParsedRow(
+        row_num, supplier_name, supplier_contact,
+        product_name, description, price, quantity,
+    )
+
+
+class CsvImporter:
+    """
+    Set-based importer for supplier CSV feeds.
+
+    Rows are consumed in chunks. Each chunk resolves its suppliers and
+    products with a handful of ``IN`` lookups and writes with
+    ``bulk_create``/``bulk_update`` instead of three round trips per row.
+    If a chunk cannot be written in one go it is replayed row by row so
+    errors are still reported against the offending row.
+    """
+
+    def __init__(self, chunk_size=None, progress=None):
+        self.chunk_size = chunk_size or settings.CSV_IMPORT_CHUNK_SIZE
+        # Called once per chunk as ``progress(rows_read, rows_committed,
+        # error_count)`` with the counts for that chunk.
+        self.progress = progress
+        self.results = {
+            'processed': 0,
+            'errors': []
+        }
+
+    def run(self, rows):
+        """Import an iterable of ``(row_num, row)`` pairs."""
+        chunk = []
+        try:
+            for item in rows:
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    self.process_chunk(chunk)
+                    chunk = []
+        finally:
+            # Rows read before a parse failure are still imported.
+            if chunk:
+                self.process_chunk(chunk)
+        return self.results
+
+    def process_chunk(self, chunk):
+        processed = self.results['processed']
+        errors = len(self.results['errors'])
+        try:
+            self.write_chunk(chunk)
+        finally:
+            if self.progress is not None:
+                self.progress(
+                    len(chunk),
+                    self.results['processed'] - processed,
+                    len(self.results['errors']) - errors,
+                )
+
+    def write_chunk(self, chunk):
+        parsed = []
+        for row_num, row in chunk:
+            try:
+                parsed.append(parse_row(row_num, row))
+            except Exception as e:
+                self.add_error(row_num, e)
+
+        if not parsed:
+            return
+
+        try:
+            with transaction.atomic():
+                self.write(parsed)
+        except Exception:
+            logger.warning("Bulk write failed, retrying chunk row by row", exc_info=True)
+            for item in parsed:
+                try:
+                    with transaction.atomic():
+                        self.write([item])
+                except Exception as e:
+                    self.add_error(item.row_num, e)
+                else:
+                    self.results['processed'] += 1
+            return
+
+        self.results['processed'] += len(parsed)
+
+    def add_error(self, row_num, error):
+        self.results['errors'].append(f"Row {row_num}: {str(error)}")
+
+    def write(self, parsed):
+        suppliers = self.resolve_suppliers(parsed)
+        products = self.resolve_products(parsed, suppliers)
+        changes = self.write_inventory(parsed, suppliers, products)
+        if changes:
+            inventory_changed.send(sender=Inventory, changes=changes)
+
+    def resolve_suppliers(self, parsed):
+        """Return ``{name: supplier_id}``, creating missing suppliers."""
+        wanted = {}
+        for item in parsed:
+            wanted.setdefault(item.supplier_name, item.supplier_contact)
+        return resolve_suppliers(wanted)
+
+    def resolve_products(self, parsed, suppliers):
+        """Return ``{(name, supplier_id): product_id}``, creating missing products."""
+        wanted = {}
+        for item in parsed:
+            key = (item.product_name, suppliers[item.supplier_name])
+            wanted.setdefault(key, item)
+
+        resolved = {}
+        existing = Product.objects.filter(
+            supplier_id__in={supplier_id for _, supplier_id in wanted},
+            name__in={name for name, _ in wanted},
+        ).values_list('name', 'supplier_id', 'id')
+        for name, supplier_id, product_id in existing:
+            if (name, supplier_id) in wanted:
+                resolved[(name, supplier_id)] = product_id
+
+        missing = [
+            Product(
+                name=name,
+                supplier_id=supplier_id,
+                description=item.description,
+                price=item.price,
+            )
+            for (name, supplier_id), item in wanted.items()
+            if (name, supplier_id) not in resolved
+        ]
+        created = Product.objects.bulk_create(
+            missing, update_conflicts=True, unique_fields=['supplier', 'name'], update_fields=['name']
+        )
+        for product in created:
+            resolved[(product.name, product.supplier_id)] = product.pk
+        if missing:
+            api_cache.rows_added('product')
+            mark_stale_on_commit(supplier_ids={product.supplier_id for product in missing})
+        return resolved
+
+    def write_inventory(self, parsed, suppliers, products):
+        """
+        Upsert inventory rows; the last quantity for a product wins.
+        Returns ``(product_id, previous_quantity, quantity)`` for each row
+        written. Runs inside ``write_chunk``'s transaction, which holds the
+        existing rows until commit so the previous quantities stay exact.
+        """
+        quantities = {}
+        for item in parsed:
+            if item.quantity is None:
+                continue
+            product_id = products[(item.product_name, suppliers[item.supplier_name])]
+            quantities[product_id] = item
+
+        if not quantities:
+            return []
+
+        now = timezone.now()
+        existing = (
+            Inventory.objects.select_for_update().filter(product_id__in=quantities)
+            .order_by('product_id').only('id', 'product_id', 'quantity')
+        )
+        changed = []
+        changes = []
+        seen = set()
+        for inventory in existing:
+            seen.add(inventory.product_id)
+            quantity = quantities[inventory.product_id].quantity
+            if inventory.quantity != quantity:
+                changes.append((inventory.product_id, inventory.quantity, quantity))
+                inventory.quantity = quantity
+                inventory.updated_at = now
+                changed.append(inventory)
+        Inventory.objects.bulk_update(changed, ['quantity', 'updated_at'], batch_size=self.chunk_size)
+
+        created = [
+            Inventory(product_id=product_id, quantity=item.quantity)
+            for product_id, item in quantities.items()
+            if product_id not in seen
+        ]
+        Inventory.objects.bulk_create(created)
+        changes.extend((inventory.product_id, None, inventory.quantity) for inventory in created)
+        return changes
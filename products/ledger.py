@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockMovement, StockSnapshot
+from .visibility import committed_cutoff
+
+# Running totals over a set of movements.
+TOTALS = {
+    'net': Coalesce(Sum('delta'), 0),
+    'received': Coalesce(Sum('delta', filter=Q(delta__gt=0)), 0),
+    'issued': Coalesce(-Sum('delta', filter=Q(delta__lt=0)), 0),
+}
+
+
+def record_movements(changes):
+    """
+    Append a movement for each ``(product_id, previous_quantity, quantity)``
+    that changed stock, in batched inserts. A ``previous_quantity`` of
+    ``None`` is a new inventory row.
+    """
+    movements = [
+        StockMovement(product_id=product_id, delta=quantity - (previous or 0))
+        for product_id, previous, quantity in changes
+        if quantity != (previous or 0)
+    ]
+    StockMovement.objects.bulk_create(movements, batch_size=settings.STOCK_LEDGER_BATCH_SIZE)
+
+
+def history_horizon(now=None):
+    """The earliest time stock history is kept for."""
+    return (now or timezone.now()) - timedelta(seconds=settings.STOCK_LEDGER_RETENTION)
+
+
+def stock_at(product_id, at):
+    """
+    ``{'quantity', 'received', 'issued'}`` for a product as of ``at``: the
+    latest snapshot at or before ``at`` plus the movements since, which
+    snapshots keep to one interval's worth. Two indexed queries. Raises
+    ``ValueError`` for times before the history horizon, or before the
+    product's opening balance when it held stock before the ledger began.
+    """
+    horizon = history_horizon()
+    if at < horizon:
+        raise ValueError(f'Stock history is only kept since {horizon.isoformat()}')
+    snapshot = StockSnapshot.objects.filter(product_id=product_id, taken_at__lte=at).order_by('-taken_at').first()
+    tail = StockMovement.objects.filter(product_id=product_id, created_at__lte=at)
+    if snapshot is None:
+        # Counting from zero is only right if the product had no stock before
+        # its first movement. An opening balance (see migration 0012) holds
+        # stock no movement accounts for, and nothing is known before it.
+        opening = StockSnapshot.objects.filter(product_id=product_id).order_by('taken_at').first()
+        if opening is not None and opening.quantity != opening.received - opening.issued:
+            raise ValueError(f'Stock history of this product starts at {opening.taken_at.isoformat()}')
+        quantity = received = issued = 0
+    else:
+        quantity, received, issued = snapshot.quantity, snapshot.received, snapshot.issued
+        tail = tail.filter(created_at__gt=snapshot.taken_at)
+    totals = tail.aggregate(**TOTALS)
+    return {
+        'quantity': quantity + totals['net'],
+        'received': received + totals['received'],
+        'issued': issued + totals['issued'],
+    }
+
+
+def movement_between(product_id, start, end):
+    """
+    Opening and closing stock of a product over ``[start, end]`` and the
+    quantities received and issued in between, from the running totals at
+    each end. Raises ``ValueError`` like :func:`stock_at`.
+    """
+    if end < start:
+        raise ValueError('end must not be before start')
+    opening, closing = stock_at(product_id, start), stock_at(product_id, end)
+    received = closing['received'] - opening['received']
+    issued = closing['issued'] - opening['issued']
+    return {
+        'opening': opening['quantity'],
+        'closing': closing['quantity'],
+        'received': received,
+        'issued': issued,
+        'net': received - issued,
+    }
+
+
+def take_snapshots(now=None):
+    """
+    Snapshot every product with movements since the last run, up to
+    ``STOCK_SNAPSHOT_SAFETY_WINDOW`` seconds before any write transaction
+    still open began (see :func:`~products.visibility.committed_cutoff`),
+    so movements still being committed are not skipped. Each snapshot is
+    the product's previous one plus the totals of its new movements, read
+    in one grouped query. Returns how many snapshots were taken.
+    """
+    cutoff = committed_cutoff(settings.STOCK_SNAPSHOT_SAFETY_WINDOW, now)
+    last_run = StockSnapshot.objects.aggregate(last=Max('taken_at'))['last']
+    if last_run is not None and cutoff <= last_run:
+        return 0
+
+    movements = StockMovement.objects.filter(created_at__lte=cutoff)
+    if last_run is not None:
+        movements = movements.filter(created_at__gt=last_run)
+    totals = list(movements.values('product_id').annotate(**TOTALS).order_by())
+
+    batch_size = settings.STOCK_LEDGER_BATCH_SIZE
+    with transaction.atomic():
+        for start in range(0, len(totals), batch_size):
+            batch = totals[start:start + batch_size]
+            latest = StockSnapshot.objects.filter(product_id=OuterRef('product_id')).order_by('-taken_at')
+            previous = {
+                snapshot.product_id: snapshot
+                for snapshot in StockSnapshot.objects.filter(
+                    product_id__in=[row['product_id'] for row in batch],
+                    id=Subquery(latest.values('id')[:1]),
+                )
+            }
+            snapshots = []
+            for row in batch:
+                base = previous.get(row['product_id'])
+                snapshots.append(StockSnapshot(
+                    product_id=row['product_id'],
+                    taken_at=cutoff,
+                    quantity=(base.quantity if base else 0) + row['net'],
+                    received=(base.received if base else 0) + row['received'],
+                    issued=(base.issued if base else 0) + row['issued'],
+                ))
+            StockSnapshot.objects.bulk_create(snapshots)
+    return len(totals)
+
+
+def compact(now=None):
+    """
+    Drop history before the horizon that no query can still need. Each
+    product keeps its latest snapshot at or before the horizon as a
+    baseline; movements up to the baseline and older snapshots are
+    deleted. Returns ``(movements_deleted, snapshots_deleted)``.
+    """
+    horizon = history_horizon(now)
+    baseline = Subquery(
+        StockSnapshot.objects.filter(product_id=OuterRef('product_id'), taken_at__lte=horizon)
+        .order_by('-taken_at').values('taken_at')[:1]
+    )
+    # Products without a baseline compare against NULL and keep everything.
+    with transaction.atomic():
+        movements, _ = StockMovement.objects.filter(created_at__lte=baseline).delete()
+        snapshots, _ = StockSnapshot.objects.filter(taken_at__lt=baseline).delete()
+    return movements, snapshots
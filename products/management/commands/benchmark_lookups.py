@@ -0,0 +1,111 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.benchmarks import summarize
+from products.importer import CsvImporter
+from products.models import Product, Supplier
+
+SEED_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large product catalogue and time the natural-key lookups and "
+        "CSV import paths. Everything runs in a transaction that is rolled "
+        "back, so the database is left as it was. Run it again after "
+        "`migrate products 0006` to measure the same paths without the keys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--suppliers', type=int, default=1000)
+        parser.add_argument('--lookups', type=int, default=1000)
+        parser.add_argument('--import-rows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            suppliers = self.seed(options['suppliers'], options['products'])
+            self.bench_lookups(rng, suppliers, options['products'], options['lookups'])
+            self.bench_import(rng, suppliers, options['products'], options['import_rows'])
+            transaction.set_rollback(True)
+
+    def seed(self, supplier_count, product_count):
+        started = time.perf_counter()
+        suppliers = Supplier.objects.bulk_create(
+            [Supplier(name=f"bench-supplier-{i}", contact_info='') for i in range(supplier_count)],
+            batch_size=SEED_BATCH_SIZE,
+        )
+        for start in range(0, product_count, SEED_BATCH_SIZE):
+            Product.objects.bulk_create([
+                Product(
+                    name=f"bench-product-{i}",
+                    supplier=suppliers[i % supplier_count],
+                    price=1,
+                )
+                for i in range(start, min(start + SEED_BATCH_SIZE, product_count))
+            ])
+        self.stdout.write(
+            f"Seeded {supplier_count} suppliers and {product_count} products "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return suppliers
+
+    def bench_lookups(self, rng, suppliers, product_count, lookups):
+        supplier_names = [rng.choice(suppliers).name for _ in range(lookups)]
+        self.report('Supplier by name', [
+            self.timed(lambda name=name: Supplier.objects.filter(name=name).values_list('id', flat=True).first())
+            for name in supplier_names
+        ])
+
+        product_keys = []
+        for _ in range(lookups):
+            i = rng.randrange(product_count)
+            product_keys.append((f"bench-product-{i}", suppliers[i % len(suppliers)].pk))
+        self.report('Product by (name, supplier)', [
+            self.timed(lambda name=name, supplier_id=supplier_id: Product.objects.filter(
+                name=name, supplier_id=supplier_id,
+            ).values_list('id', flat=True).first())
+            for name, supplier_id in product_keys
+        ])
+
+        name, supplier_id = product_keys[0]
+        self.stdout.write(Supplier.objects.filter(name=supplier_names[0]).explain())
+        self.stdout.write(Product.objects.filter(name=name, supplier_id=supplier_id).explain())
+
+    def bench_import(self, rng, suppliers, product_count, row_count):
+        # Half the rows update seeded products, half create new ones.
+        rows = []
+        for row_num in range(1, row_count + 1):
+            i = rng.randrange(product_count) if row_num % 2 else product_count + row_num
+            rows.append((row_num, {
+                'supplier_name': suppliers[i % len(suppliers)].name,
+                'supplier_contact': '',
+                'product_name': f"bench-product-{i}",
+                'description': '',
+                'price': '1.00',
+                'quantity': str(rng.randrange(100)),
+            }))
+
+        started = time.perf_counter()
+        results = CsvImporter().run(rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"CSV import: {results['processed']} rows in {elapsed:.2f}s "
+            f"({results['processed'] / elapsed:.0f} rows/s, {len(results['errors'])} errors)"
+        )
+
+    def timed(self, func):
+        started = time.perf_counter()
+        func()
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, label, timings):
+        summary = summarize(timings)
+        self.stdout.write(
+            f"{label}: mean {summary['mean_ms']}ms, p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms"
+        )
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic catalogue of suppliers, products "
+        "and inventory, and optionally a CSV feed in the upload format."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suppliers', type=int, default=100)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--csv', help="Also write a CSV feed to this path.")
+        parser.add_argument('--csv-rows', type=int, default=10000)
+        parser.add_argument(
+            '--update-ratio', type=float, default=0.5,
+            help="Share of CSV rows that restock existing products; the rest add new ones.",
+        )
+        parser.add_argument(
+            '--csv-only', action='store_true',
+            help="Only write the CSV feed, assuming the catalogue already exists.",
+        )
+
+    def handle(self, *args, **options):
+        if options['suppliers'] < 1:
+            raise CommandError("--suppliers must be at least 1.")
+
+        if not options['csv_only']:
+            self.generate_catalogue(options)
+        if options['csv']:
+            self.write_csv(options)
+
+    def generate_catalogue(self, options):
+        if synthetic.synthetic_data_exists():
+            raise CommandError("Synthetic data already exists in this database.")
+
+        def progress(products_written):
+            self.stdout.write(f"  {products_written}/{options['products']} products")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            synthetic.generate_catalogue(
+                options['suppliers'],
+                options['products'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                progress=progress,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['suppliers']} suppliers and {options['products']} products "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def write_csv(self, options):
+        with open(options['csv'], 'w', newline='', encoding='utf-8') as csv_file:
+            synthetic.write_csv(
+                csv_file,
+                options['csv_rows'],
+                options['suppliers'],
+                options['products'],
+                seed=options['seed'],
+                update_ratio=options['update_ratio'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['csv_rows']} rows to {options['csv']}"))
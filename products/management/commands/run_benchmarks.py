@@ -0,0 +1,127 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products import benchmarks
+
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the CSV importer and the API endpoints against the synthetic "
+        "catalogue created by generate_synthetic_data, and write the results as "
+        "JSON so runs from different commits can be compared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write the JSON report to this path instead of stdout.")
+        parser.add_argument('--compare', help="Baseline JSON report to compare this run against.")
+        parser.add_argument('--label', default='', help="Free-form label stored in the report.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--import-rows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help="Serve requests through the configured cache instead of measuring uncached responses.",
+        )
+        parser.add_argument(
+            '--url',
+            help="Load a running server at this base URL over HTTP instead of benchmarking in-process.",
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients for --url.")
+        parser.add_argument('--skip-import', action='store_true')
+        parser.add_argument('--skip-endpoints', action='store_true')
+        parser.add_argument('--skip-serialization', action='store_true')
+        parser.add_argument(
+            '--serialization-page-size', type=int, default=100,
+            help="Rows per page when comparing serializers with projections.",
+        )
+
+    def handle(self, *args, **options):
+        size = benchmarks.catalogue_size()
+        if not size['suppliers']:
+            raise CommandError("No synthetic data found; run generate_synthetic_data first.")
+
+        report = {
+            'label': options['label'],
+            'commit': self.git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': size,
+            'options': {
+                'requests': options['requests'],
+                'import_rows': options['import_rows'],
+                'seed': options['seed'],
+                'cache': 'warm' if options['warm_cache'] else 'cold',
+            },
+        }
+
+        if options['url']:
+            # The server's own settings decide caching and serving here.
+            report['options'].update(cache=None, concurrency=options['concurrency'])
+            report['http'] = benchmarks.benchmark_http(
+                options['url'], options['requests'], options['concurrency'], size, seed=options['seed'],
+            )
+        else:
+            self.run_in_process(report, size, options)
+
+        self.write_report(report, options)
+
+    def run_in_process(self, report, size, options):
+        if not options['skip_import']:
+            report['import'] = benchmarks.benchmark_import(options['import_rows'], size, seed=options['seed'])
+
+        if not options['skip_endpoints']:
+            overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+            if not options['warm_cache']:
+                overrides['CACHES'] = DUMMY_CACHES
+            with override_settings(**overrides):
+                report['endpoints'] = benchmarks.benchmark_endpoints(
+                    APIClient(), options['requests'], size, seed=options['seed'],
+                )
+
+        if not options['skip_serialization']:
+            report['serialization'] = benchmarks.benchmark_serialization(
+                options['serialization_page_size'], options['requests'],
+            )
+
+    def write_report(self, report, options):
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as report_file:
+                report_file.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(options['compare'], report)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, baseline_path, report):
+        with open(baseline_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(f"Compared with {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+        for section, metric, old, new, change in benchmarks.compare(baseline, report):
+            if change is None:
+                delta = 'n/a'
+            else:
+                delta = f"{change:+.1%}"
+                style = self.style.SUCCESS if change > 0.05 else self.style.ERROR if change < -0.05 else str
+                delta = style(delta)
+            self.stdout.write(f"  {section:<18} {metric:<16} {old:>12} -> {new:<12} {delta}")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from products import metrics
+
+
+class Command(BaseCommand):
+    help = "Summarize the Celery task metrics recorded by the worker signal handlers."
+
+    def handle(self, *args, **options):
+        tasks = metrics.task_names()
+        runs = metrics.TASK_RUNS.values(tasks)
+        failures = metrics.TASK_FAILURES.values(tasks)
+        rows = metrics.TASK_ROWS.values(tasks)
+
+        self.stdout.write(
+            f"{'task':<42} {'runs':>7} {'failed':>7} {'fail %':>7} "
+            f"{'avg wait s':>11} {'avg run s':>10} {'rows':>10} {'rows/s':>9}"
+        )
+        for task in tasks:
+            if task not in runs:
+                continue
+            run_count = runs[task]
+            failed = failures.get(task, 0)
+            wait_count, wait_sum = metrics.TASK_QUEUE_WAIT.summary(task)
+            run_count_timed, run_sum = metrics.TASK_DURATION.summary(task)
+            row_count = rows.get(task)
+            self.stdout.write(
+                f"{task:<42} {run_count:>7} {failed:>7} {failed / run_count:>7.1%} "
+                f"{self.mean(wait_sum, wait_count):>11} {self.mean(run_sum, run_count_timed):>10} "
+                f"{row_count if row_count is not None else '-':>10} "
+                f"{self.rate(row_count, run_sum) if row_count is not None else '-':>9}"
+            )
+
+    def mean(self, total, count):
+        return f"{total / count:.3f}" if count else '-'
+
+    def rate(self, row_count, seconds):
+        return f"{row_count / seconds:.0f}" if seconds else '-'
@@ -0,0 +1,180 @@
+import math
+
+from django.core.cache import cache
+
+# Observations are stored as integer counters in the shared cache so that
+# every web and worker process feeds the same histograms. Values are kept
+# in micro-units because the cache can only increment integers.
+VALUE_SCALE = 1_000_000
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+TASK_DURATION_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600)
+ROWS_PER_SECOND_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+def _increment(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+
+    def key(self, label_value, suffix):
+        return f'metrics:{self.name}:{label_value}:{suffix}'
+
+    def header(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+    def labels(self, label_value, **extra):
+        pairs = [(self.label, label_value), *extra.items()]
+        return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, label_value, amount=1):
+        _increment(self.key(label_value, 'total'), amount)
+
+    def values(self, label_values):
+        """Return ``{label_value: total}`` for the labels that were counted."""
+        keys = {self.key(label_value, 'total'): label_value for label_value in label_values}
+        return {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    def collect(self, label_values):
+        totals = self.values(label_values)
+        lines = self.header()
+        for label_value in label_values:
+            if label_value in totals:
+                lines.append(f'{self.name}_total{{{self.labels(label_value)}}} {totals[label_value]}')
+        return lines
+
+
+class Histogram(Metric):
+    """
+    A Prometheus histogram with one label. Each observation increments a
+    single bucket plus the count and sum; buckets are made cumulative
+    when collected.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label, buckets):
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, label_value, value):
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        _increment(self.key(label_value, index))
+        _increment(self.key(label_value, 'count'))
+        _increment(self.key(label_value, 'sum'), int(round(value * VALUE_SCALE)))
+
+    def summary(self, label_value):
+        """Return ``(count, sum)`` of the observations for ``label_value``."""
+        values = cache.get_many([self.key(label_value, 'count'), self.key(label_value, 'sum')])
+        count = values.get(self.key(label_value, 'count'), 0)
+        return count, values.get(self.key(label_value, 'sum'), 0) / VALUE_SCALE
+
+    def collect(self, label_values):
+        suffixes = [*range(len(self.buckets)), 'count', 'sum']
+        keys = [self.key(label_value, suffix) for label_value in label_values for suffix in suffixes]
+        values = cache.get_many(keys)
+        lines = self.header()
+        for label_value in label_values:
+            count = values.get(self.key(label_value, 'count'))
+            if not count:
+                continue
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += values.get(self.key(label_value, index), 0)
+                labels = self.labels(label_value, le=_format_value(bound))
+                lines.append(f'{self.name}_bucket{{{labels}}} {cumulative}')
+            total = values.get(self.key(label_value, 'sum'), 0) / VALUE_SCALE
+            lines.append(f'{self.name}_sum{{{self.labels(label_value)}}} {_format_value(total)}')
+            lines.append(f'{self.name}_count{{{self.labels(label_value)}}} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'ims_http_request_duration_seconds', 'Total time spent handling sampled requests.', 'view',
+    LATENCY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'ims_http_request_db_duration_seconds', 'Time sampled requests spent in database queries.', 'view',
+    LATENCY_BUCKETS,
+)
+REQUEST_SERIALIZATION_DURATION = Histogram(
+    'ims_http_request_serialization_duration_seconds', 'Time sampled requests spent rendering the response.',
+    'view', LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'ims_http_request_db_queries', 'Database queries run by sampled requests.', 'view',
+    QUERY_COUNT_BUCKETS,
+)
+
+REQUEST_METRICS = [REQUEST_DURATION, REQUEST_DB_DURATION, REQUEST_SERIALIZATION_DURATION, REQUEST_DB_QUERIES]
+
+TASK_QUEUE_WAIT = Histogram(
+    'ims_celery_task_queue_wait_seconds', 'Time tasks waited between publishing and starting.', 'task',
+    TASK_DURATION_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    'ims_celery_task_duration_seconds', 'Time tasks spent running.', 'task',
+    TASK_DURATION_BUCKETS,
+)
+TASK_ROWS_PER_SECOND = Histogram(
+    'ims_celery_task_rows_per_second', 'CSV rows imported per second by import tasks.', 'task',
+    ROWS_PER_SECOND_BUCKETS,
+)
+TASK_RUNS = Counter('ims_celery_task_runs', 'Tasks that finished running, whatever the outcome.', 'task')
+TASK_FAILURES = Counter('ims_celery_task_failures', 'Tasks that raised an exception.', 'task')
+TASK_ROWS = Counter('ims_celery_task_rows', 'CSV rows committed by import tasks.', 'task')
+TASK_ROW_ERRORS = Counter('ims_celery_task_row_errors', 'CSV rows rejected by import tasks.', 'task')
+
+TASK_METRICS = [
+    TASK_QUEUE_WAIT, TASK_DURATION, TASK_ROWS_PER_SECOND,
+    TASK_RUNS, TASK_FAILURES, TASK_ROWS, TASK_ROW_ERRORS,
+]
+
+
+def render(metrics_and_labels):
+    """
+    Render ``(metric, label_values)`` pairs in the Prometheus text
+    exposition format.
+    """
+    lines = []
+    for metric, label_values in metrics_and_labels:
+        lines.extend(metric.collect(label_values))
+    return '\n'.join(lines) + '\n'
+
+
+def task_names():
+    """Names of the registered application tasks."""
+    from celery import current_app
+
+    return sorted(name for name in current_app.tasks if not name.startswith('celery.'))
@@ -0,0 +1,166 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_VIEW = '<unmatched>'
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+def _install_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+@contextmanager
+def serialization_timer(request):
+    """
+    Count the time spent in the block as serialization time for a sampled
+    request. Views wrap building their payloads in it; rendering DRF
+    responses is counted by the middleware.
+    """
+    timings = getattr(request, 'perf_timings', None)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.render += time.perf_counter() - started
+
+
+class PerformanceMiddleware:
+    """
+    Record query count, database time, serialization time (building the
+    payload, see :func:`serialization_timer`, and rendering it) and total
+    latency for a sample of requests.
+
+    Sampled responses carry a ``Server-Timing`` header and feed the
+    per-view histograms served by the metrics endpoint. Only a fraction
+    ``PERF_SAMPLE_RATE`` of requests is instrumented, so the cost of
+    timing queries and updating the shared counters stays off most
+    requests under load. Failing to update the counters (say, while the
+    cache is down) is logged and never fails the request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timings = request.perf_timings = RequestTimings()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timings):
+            response = self.get_response(request)
+        self.record(request, response, timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        timings = request.perf_timings = RequestTimings()
+        started = time.perf_counter()
+        # Connections are per thread and the async ORM runs queries in the
+        # request's sync thread, so the wrapper has to be installed there.
+        await sync_to_async(_install_wrapper)(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(timings)
+        # Updating the shared counters may go over the network.
+        await sync_to_async(self.record)(request, response, timings, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, timings, total):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f'serialize;dur={timings.render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        view = request.resolver_match.view_name if request.resolver_match else UNMATCHED_VIEW
+        if view in settings.PERF_EXCLUDED_VIEWS:
+            return
+        try:
+            metrics.REQUEST_DURATION.observe(view, total)
+            metrics.REQUEST_DB_DURATION.observe(view, timings.db)
+            metrics.REQUEST_SERIALIZATION_DURATION.observe(view, timings.render)
+            metrics.REQUEST_DB_QUERIES.observe(view, timings.queries)
+        except Exception:
+            logger.warning("Could not record request metrics for %s", view, exc_info=True)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that
+        # rendering from here to the post-render callback.
+        timings = getattr(request, 'perf_timings', None)
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(timings))
+        return response
+
+    def rendered(self, timings):
+        timings.render += time.perf_counter() - timings.render_started
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise's middleware made async-capable. A sync-only middleware
+    forces Django to run the rest of the stack in a worker thread under
+    ASGI, which would hold a thread for every request to the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
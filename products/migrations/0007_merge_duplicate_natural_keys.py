@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Collapse duplicate suppliers (by name) and products (by supplier and
+    name) created before the natural keys were enforced, keeping the oldest
+    row and repointing references to it.
+    """
+    Supplier = apps.get_model('products', 'Supplier')
+    Product = apps.get_model('products', 'Product')
+    Inventory = apps.get_model('products', 'Inventory')
+    LowStockAlert = apps.get_model('products', 'LowStockAlert')
+
+    duplicate_suppliers = (
+        Supplier.objects.values('name')
+        .annotate(keep=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicate_suppliers:
+        duplicates = Supplier.objects.filter(name=group['name']).exclude(id=group['keep'])
+        Product.objects.filter(supplier__in=duplicates).update(supplier_id=group['keep'])
+        duplicates.delete()
+
+    duplicate_products = (
+        Product.objects.values('supplier_id', 'name')
+        .annotate(keep=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicate_products:
+        duplicates = Product.objects.filter(
+            supplier_id=group['supplier_id'], name=group['name']
+        ).exclude(id=group['keep'])
+        LowStockAlert.objects.filter(product__in=duplicates).update(product_id=group['keep'])
+        if not Inventory.objects.filter(product_id=group['keep']).exists():
+            moved = Inventory.objects.filter(product__in=duplicates).order_by('-updated_at').first()
+            if moved is not None:
+                moved.product_id = group['keep']
+                moved.save(update_fields=['product'])
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_reorder_points'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,137 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The search index lives outside the Product model so ordinary product
+# queries never read it. Triggers keep it in step with every write path,
+# including the importer's bulk upserts, and with supplier renames.
+#
+# On SQLite, Django rebuilds a table (and drops its triggers) for most
+# ALTER TABLE changes; a later migration that does so to products_product
+# or products_supplier must run SQLITE_FORWARDS again, or
+# test_index_triggers_survive_migrations fails.
+
+POSTGRES_FORWARDS = [
+    'ALTER TABLE products_product ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION products_product_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT name FROM products_supplier WHERE id = NEW.supplier_id), ''
+            )), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER products_product_search_vector
+    BEFORE INSERT OR UPDATE OF name, description, supplier_id ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector()
+    """,
+    """
+    CREATE FUNCTION products_supplier_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE products_product SET name = name WHERE supplier_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER products_supplier_search_vector
+    AFTER UPDATE OF name ON products_supplier
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION products_supplier_search_vector()
+    """,
+    'UPDATE products_product SET name = name',
+    'CREATE INDEX product_search_vector_idx ON products_product USING GIN (search_vector)',
+    'CREATE INDEX product_name_trgm_idx ON products_product USING GIN (name gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARDS = [
+    'DROP TRIGGER products_supplier_search_vector ON products_supplier',
+    'DROP FUNCTION products_supplier_search_vector()',
+    'DROP TRIGGER products_product_search_vector ON products_product',
+    'DROP FUNCTION products_product_search_vector()',
+    'DROP INDEX product_name_trgm_idx',
+    'ALTER TABLE products_product DROP COLUMN search_vector',
+]
+
+SQLITE_FORWARDS = [
+    'DROP TABLE IF EXISTS products_product_search',
+    """
+    CREATE VIRTUAL TABLE products_product_search USING fts5(
+        name, description, supplier_name, tokenize='porter unicode61', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_search_insert AFTER INSERT ON products_product BEGIN
+        INSERT INTO products_product_search (rowid, name, description, supplier_name)
+        SELECT NEW.id, NEW.name, NEW.description, name FROM products_supplier WHERE id = NEW.supplier_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_search_update
+    AFTER UPDATE OF name, description, supplier_id ON products_product BEGIN
+        UPDATE products_product_search
+        SET name = NEW.name,
+            description = NEW.description,
+            supplier_name = (SELECT name FROM products_supplier WHERE id = NEW.supplier_id)
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_search_delete AFTER DELETE ON products_product BEGIN
+        DELETE FROM products_product_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_supplier_search_update AFTER UPDATE OF name ON products_supplier BEGIN
+        UPDATE products_product_search SET supplier_name = NEW.name
+        WHERE rowid IN (SELECT id FROM products_product WHERE supplier_id = NEW.id);
+    END
+    """,
+    """
+    INSERT INTO products_product_search (rowid, name, description, supplier_name)
+    SELECT product.id, product.name, product.description, supplier.name
+    FROM products_product product JOIN products_supplier supplier ON supplier.id = product.supplier_id
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER products_supplier_search_update',
+    'DROP TRIGGER products_product_search_delete',
+    'DROP TRIGGER products_product_search_update',
+    'DROP TRIGGER products_product_search_insert',
+    'DROP TABLE products_product_search',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARDS, POSTGRES_BACKWARDS),
+    'sqlite': (SQLITE_FORWARDS, SQLITE_BACKWARDS),
+}
+
+
+def create_search_index(apps, schema_editor):
+    forwards, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in forwards:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, backwards = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in backwards:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_tombstone'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierStockSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('below_reorder_point', models.PositiveIntegerField(default=0)),
+                ('stale', models.BooleanField(default=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_summary', to='products.supplier')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='supplierstocksummary',
+            index=models.Index(condition=models.Q(('stale', True)), fields=['supplier'], name='summary_stale_idx'),
+        ),
+    ]
@@ -1,12 +1,24 @@
 from django.db import models
+from django.db.models import F, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 
 
 class Supplier(models.Model):
-    name = models.CharField(max_length=255)
+    DEFAULT_REORDER_POINT = 10
+
+    name = models.CharField(max_length=255, unique=True)
     contact_info = models.TextField()
+    # Reorder point for products of this supplier that don't set their own.
+    default_reorder_point = models.PositiveIntegerField(default=DEFAULT_REORDER_POINT)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['default_reorder_point'], name='supplier_reorder_point_idx'),
+            models.Index(fields=['updated_at', 'id'], name='supplier_updated_at_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -16,18 +28,212 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name="products")
+    # Stock level below which the product needs reordering; falls back to
+    # the supplier's default_reorder_point when unset.
+    reorder_point = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['supplier', 'name'], name='unique_product_name_per_supplier'),
+        ]
+        indexes = [
+            models.Index(fields=['reorder_point'], name='product_reorder_point_idx'),
+            models.Index(fields=['updated_at', 'id'], name='product_updated_at_id_idx'),
+            # Filtered and ordered product lists (see products.filters).
+            models.Index(fields=['supplier', 'id'], name='product_supplier_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored supplier so moving a product to another
+        # supplier can refresh both suppliers' stock summaries.
+        instance._loaded_supplier_id = instance.__dict__.get('supplier_id')
+        return instance
+
     def __str__(self):
         return f'{self.supplier} added {self.name}'
 
 
+def effective_reorder_point(prefix=''):
+    """Expression for a product's reorder point, relative to ``prefix``."""
+    return Coalesce(F(f'{prefix}reorder_point'), F(f'{prefix}supplier__default_reorder_point'))
+
+
+class InventoryQuerySet(models.QuerySet):
+    def with_reorder_point(self):
+        return self.annotate(reorder_point=effective_reorder_point('product__'))
+
+    def below_reorder_point(self):
+        """
+        Inventory rows whose quantity is below their product's reorder point,
+        in one query. The highest reorder point anywhere is an upper bound
+        on ``quantity``. It is computed by two indexed subqueries, so the
+        database can range-scan the quantity index before joining, instead
+        of scanning the whole table.
+        """
+        highest_product_point = Product.objects.filter(reorder_point__isnull=False).order_by('-reorder_point')
+        highest_supplier_point = Supplier.objects.order_by('-default_reorder_point')
+        upper_bound = Greatest(
+            Coalesce(Subquery(highest_product_point.values('reorder_point')[:1]), Value(0)),
+            Coalesce(Subquery(highest_supplier_point.values('default_reorder_point')[:1]), Value(0)),
+        )
+        return (
+            self.filter(quantity__lt=upper_bound)
+            .with_reorder_point()
+            .filter(quantity__lt=F('reorder_point'))
+        )
+
+
 class Inventory(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="inventory")
     quantity = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InventoryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='inventory_updated_at_id_idx'),
+            models.Index(fields=['quantity', 'id'], name='inventory_quantity_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored quantity so saves can tell when stock crosses
+        # the reorder point.
+        instance._loaded_quantity = instance.__dict__.get('quantity')
+        return instance
+
     def __str__(self):
         return f'Inventory for {self.product.name}: {self.quantity} items'
+
+
+class LowStockAlert(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="low_stock_alerts")
+    quantity = models.IntegerField()
+    threshold = models.IntegerField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'product'], name='lowstockalert_sent_product_idx'),
+        ]
+
+    def __str__(self):
+        return f'Low stock alert for product {self.product_id}: {self.quantity} items'
+
+
+class ImportJob(models.Model):
+    task_id = models.CharField(max_length=255, unique=True)
+    file_name = models.CharField(max_length=255)
+    rows_read = models.PositiveIntegerField(default=0)
+    rows_committed = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Import of {self.file_name} ({self.task_id})'
+
+
+class Tombstone(models.Model):
+    """
+    A deleted supplier, product or inventory row, kept so change feed
+    clients can delete their copy. Pruned after
+    ``CHANGE_FEED_TOMBSTONE_RETENTION``.
+    """
+    resource = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'id'], name='tombstone_resource_id_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'Deleted {self.resource} {self.object_id}'
+
+
+class StockMovement(models.Model):
+    """
+    One change to a product's stock, appended whenever its inventory
+    quantity changes. Movements older than ``STOCK_LEDGER_RETENTION`` are
+    folded into snapshots by compaction.
+    """
+    # Indexed by (product, created_at) below.
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_movements", db_index=False
+    )
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='movement_product_created_idx'),
+            models.Index(fields=['created_at'], name='movement_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.delta:+d} items of product {self.product_id}'
+
+
+class StockSnapshot(models.Model):
+    """
+    A product's stock as of ``taken_at``: its quantity and the running
+    totals received and issued, covering every movement up to then.
+    """
+    # Indexed by the (product, taken_at) constraint below.
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_snapshots", db_index=False
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+    received = models.BigIntegerField(default=0)
+    issued = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='snapshot_product_taken_at_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['taken_at'], name='snapshot_taken_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'Stock of product {self.product_id} at {self.taken_at}: {self.quantity} items'
+
+
+class SupplierStockSummary(models.Model):
+    """
+    Stock aggregates of one supplier's products, precomputed for reports.
+    Writes that change them mark the row ``stale``; the
+    ``refresh_supplier_summaries`` task recomputes stale rows.
+    """
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, related_name="stock_summary")
+    product_count = models.PositiveIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    below_reorder_point = models.PositiveIntegerField(default=0)
+    stale = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['supplier'], condition=Q(stale=True), name='summary_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f'Stock summary for supplier {self.supplier_id}'
@@ -0,0 +1,152 @@
+import base64
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of ``paginate_queryset`` for async views: counts
+        with ``acount()`` and fetches the page with ``async for``, then
+        leaves the paginator in the same state for the link and response
+        helpers.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached property; fill it without a sync query.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+
+def encode_position(updated_at, pk):
+    raw = f'{updated_at.isoformat()}|{pk}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_position(token):
+    """Return ``(updated_at, pk)`` for a cursor token, or raise ``ValueError``."""
+    raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    updated_at, pk = raw.split('|')
+    updated_at = parse_datetime(updated_at)
+    if updated_at is None:
+        raise ValueError('Invalid timestamp')
+    return updated_at, int(pk)
+
+
+def seek(queryset, position, field='updated_at'):
+    """
+    Restrict ``queryset`` to rows after ``position`` in ``(field, id)``
+    order. Written as a range on ``field`` so an index on ``(field, id)``
+    is used to seek straight to the start of the page.
+    """
+    queryset = queryset.order_by(field, 'id')
+    if position is None:
+        return queryset
+    value, pk = position
+    return queryset.filter(**{f'{field}__gte': value}).exclude(**{field: value, 'id__lte': pk})
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over ``(updated_at, id)`` for deep scans.
+
+    Unlike page numbers there is no OFFSET and no COUNT, so every page costs
+    the same however far into the table the client is. Pass an empty
+    ``cursor`` to start and follow ``next`` until it is null. A row that is
+    updated during a walk moves to the end and is returned again.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+    # Columns a page of ``values()`` rows must carry to build the next link.
+    position_fields = ('updated_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        results = list(seek(queryset, self.get_position(request))[:page_size + 1])
+        return self.set_page(results, page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        results = [obj async for obj in seek(queryset, self.get_position(request))[:page_size + 1]]
+        return self.set_page(results, page_size)
+
+    def get_position(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            return decode_position(token)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def set_page(self, results, page_size):
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        if isinstance(last, dict):
+            # A page of ``values()`` rows.
+            position = encode_position(*(last[field] for field in self.position_fields))
+        else:
+            position = encode_position(last.updated_at, last.pk)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, position)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import InventorySerializer, ProductSerializer, ReorderItemSerializer, SupplierSerializer
+
+# How an accessor turns a column value into its representation.
+PASSTHROUGH = 'passthrough'  # the database value is already the representation
+DATETIME = 'datetime'        # DRF's default ISO 8601 output, inlined
+FORMAT = 'format'            # the serializer field's own to_representation
+NESTED = 'nested'            # a nested serializer, keyed by its primary key
+
+# Serializer fields whose representation of a database value is the value
+# itself, so the projection can skip calling ``to_representation``.
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def split_paths(value):
+    """Split a comma separated query parameter into dotted field paths."""
+    return [path.strip() for path in (value or '').split(',') if path.strip()]
+
+
+class Projection:
+    """
+    Read-only fast path for a serializer's list output.
+
+    The serializer's readable fields are compiled once into a flat column
+    list for ``QuerySet.values()`` and a list of accessors that build the
+    same nested dicts the serializer would, without instantiating models,
+    nested serializers or per-field ``get_attribute`` lookups. Decimals go
+    through the serializer field's own ``to_representation``; datetimes
+    use DRF's ISO 8601 formatting with the current timezone looked up
+    once per page instead of once per value. The output is identical.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def compiled(self):
+        # Compiled on first use, once the app registry can build the fields.
+        columns = []
+        accessors = self.compile(self.serializer_class(), '', columns)
+        return columns, accessors
+
+    def compile(self, serializer, prefix, columns):
+        accessors = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source or isinstance(field, serializers.SerializerMethodField):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} cannot be projected onto columns"
+                )
+            column = prefix + field.source
+            if isinstance(field, serializers.BaseSerializer):
+                column = f'{column}__pk'
+                accessors.append((name, column, NESTED, self.compile(field, f'{prefix}{field.source}__', columns)))
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                accessors.append((name, column, PASSTHROUGH, None))
+            elif isinstance(field, serializers.DateTimeField) and self.inline_datetime(field):
+                accessors.append((name, column, DATETIME, None))
+            else:
+                accessors.append((name, column, FORMAT, field.to_representation))
+            columns.append(column)
+        return accessors
+
+    def inline_datetime(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        return (
+            settings.USE_TZ
+            and output_format is not None
+            and output_format.lower() == ISO_8601
+            and not hasattr(field, 'timezone')
+        )
+
+    def for_request(self, request, keep=()):
+        """The projection selected by the request's ``fields`` and ``expand`` parameters."""
+        return self.select(
+            split_paths(request.query_params.get(FIELDS_QUERY_PARAM)),
+            split_paths(request.query_params.get(EXPAND_QUERY_PARAM)),
+            keep,
+        )
+
+    def select(self, fields=(), expand=(), keep=()):
+        """
+        A projection rendering only ``fields``, given as dotted paths such as
+        ``product.name``. Once either ``fields`` or ``expand`` is given,
+        nested objects are rendered as their id unless they are listed in
+        ``expand`` or a field inside them is selected. ``keep`` lists extra
+        columns to fetch without rendering them, such as the pagination
+        position. Raises ``ValueError`` for a path that does not exist.
+        """
+        if not fields and not expand:
+            columns, accessors = self.compiled
+            missing = [column for column in keep if column not in columns]
+            if not missing:
+                return self
+            projection = Projection(self.serializer_class)
+            projection.compiled = columns + missing, accessors
+            return projection
+        _, accessors = self.compiled
+        for path in fields:
+            self.resolve(accessors, path, expandable=False)
+        for path in expand:
+            self.resolve(accessors, path, expandable=True)
+
+        columns = []
+        selected = self.select_accessors(accessors, '', fields, expand, columns)
+        columns += [column for column in keep if column not in columns]
+        projection = Projection(self.serializer_class)
+        projection.compiled = columns, selected
+        return projection
+
+    def resolve(self, accessors, path, expandable):
+        segments = path.split('.')
+        for depth, segment in enumerate(segments, start=1):
+            accessor = next((accessor for accessor in accessors if accessor[0] == segment), None)
+            if accessor is None:
+                raise ValueError(f"Unknown field '{path}'")
+            _, _, kind, nested = accessor
+            if kind is not NESTED and (depth < len(segments) or expandable):
+                raise ValueError(f"Field '{path}' cannot be expanded")
+            accessors = nested
+
+    def select_accessors(self, accessors, prefix, fields, expand, columns):
+        def names(paths):
+            return {path[len(prefix):].split('.')[0] for path in paths if path.startswith(prefix)}
+
+        # An empty selection at this level keeps every field.
+        wanted = names(fields)
+        expanded = names(expand) | names(path for path in fields if '.' in path[len(prefix):])
+        selected = []
+        for name, column, kind, arg in accessors:
+            if wanted and name not in wanted and name not in expanded:
+                continue
+            if kind is NESTED:
+                if name in expanded:
+                    arg = self.select_accessors(arg, f'{prefix}{name}.', fields, expand, columns)
+                else:
+                    # Collapsed to the related object's id.
+                    kind, arg = PASSTHROUGH, None
+            selected.append((name, column, kind, arg))
+            columns.append(column)
+        return selected
+
+    def queryset(self, queryset):
+        """``queryset`` narrowed to the projected columns, yielding dicts."""
+        columns, _ = self.compiled
+        return queryset.values(*columns)
+
+    def serialize(self, rows):
+        _, accessors = self.compiled
+        tz = timezone.get_current_timezone()
+        return [self.build(row, accessors, tz) for row in rows]
+
+    def build(self, row, accessors, tz):
+        data = {}
+        for name, column, kind, arg in accessors:
+            value = row[column]
+            if value is None:
+                data[name] = None
+            elif kind is PASSTHROUGH:
+                data[name] = value
+            elif kind is DATETIME:
+                value = value.astimezone(tz).isoformat()
+                data[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+            elif kind is NESTED:
+                data[name] = self.build(row, arg, tz)
+            else:
+                data[name] = arg(value)
+        return data
+
+
+SUPPLIER_PROJECTION = Projection(SupplierSerializer)
+PRODUCT_PROJECTION = Projection(ProductSerializer)
+INVENTORY_PROJECTION = Projection(InventorySerializer)
+REORDER_ITEM_PROJECTION = Projection(ReorderItemSerializer)
@@ -0,0 +1,125 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+MAX_TERMS = 8
+
+
+def search_terms(text):
+    """The words of a search query, lowercased; punctuation is dropped."""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+class RankedSearch:
+    """
+    Product ids matching a query, best match first, from the database's
+    full-text index (see migration 0010). Supports ``count()`` and slicing
+    so it can be handed to a paginator like a queryset; each slice is one
+    query that ranks inside the index and returns only that page's ids.
+
+    ``count_sql`` and ``page_sql`` take the backend's match expression
+    ``query``; ``page_sql`` also takes the page's limit and offset.
+    """
+
+    def __init__(self, query, count_sql, page_sql):
+        self.query = query
+        self.count_sql = count_sql
+        self.page_sql = page_sql
+        self._count = None
+
+    def page_params(self, limit, offset):
+        return [self.query, limit, offset]
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(self.count_sql, [self.query])
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(self.page_sql, self.page_params(stop - start, start))
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearch(RankedSearch):
+    """
+    ``tsvector`` search with prefix matching on every term, ranked with
+    ``ts_rank_cd`` (name over supplier name over description). Queries the
+    index does not match at all, typically misspellings, fall back to
+    trigram word similarity on the product name.
+    """
+    fts_count_sql = (
+        "SELECT COUNT(*) FROM products_product WHERE search_vector @@ to_tsquery('english', %s)"
+    )
+    fts_page_sql = (
+        "SELECT id FROM products_product WHERE search_vector @@ to_tsquery('english', %s) "
+        "ORDER BY ts_rank_cd(search_vector, to_tsquery('english', %s)) DESC, id LIMIT %s OFFSET %s"
+    )
+    trigram_count_sql = "SELECT COUNT(*) FROM products_product WHERE %s <%% name"
+    trigram_page_sql = (
+        "SELECT id FROM products_product WHERE %s <%% name "
+        "ORDER BY word_similarity(%s, name) DESC, id LIMIT %s OFFSET %s"
+    )
+
+    def __init__(self, terms):
+        super().__init__(' & '.join(f'{term}:*' for term in terms), self.fts_count_sql, self.fts_page_sql)
+        if self.count() == 0:
+            self.count_sql, self.page_sql = self.trigram_count_sql, self.trigram_page_sql
+            self.query = ' '.join(terms)
+            self._count = None
+
+    def page_params(self, limit, offset):
+        # The ranking expression repeats the query.
+        return [self.query, self.query, limit, offset]
+
+
+class SqliteSearch(RankedSearch):
+    """FTS5 search with prefix matching on every term, ranked by ``bm25``."""
+    match_count_sql = 'SELECT COUNT(*) FROM products_product_search WHERE products_product_search MATCH %s'
+    match_page_sql = (
+        'SELECT rowid FROM products_product_search WHERE products_product_search MATCH %s '
+        'ORDER BY bm25(products_product_search, 10.0, 1.0, 5.0), rowid LIMIT %s OFFSET %s'
+    )
+
+    def __init__(self, terms):
+        super().__init__(
+            ' '.join(f'"{term}"*' for term in terms), self.match_count_sql, self.match_page_sql
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SqliteSearch,
+}
+
+
+def search_products(text):
+    """
+    Ids of the products matching ``text`` in their name, description or
+    supplier name, best first, as a sliceable sequence with ``count()``.
+    Databases without a search index get an unranked substring match.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    backend = BACKENDS.get(connection.vendor)
+    if backend is not None:
+        return backend(terms)
+    match = Q()
+    for term in terms:
+        match &= Q(name__icontains=term) | Q(description__icontains=term) | Q(supplier__name__icontains=term)
+    return Product.objects.filter(match).order_by('id').values_list('id', flat=True)
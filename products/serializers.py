@@ -1,16 +1,100 @@
+import json
+from celery import states
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Product, Supplier, Inventory
+from .models import Product, Supplier, Inventory, ImportJob, SupplierStockSummary
+from .signals import rows_upserted
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    ``PrimaryKeyRelatedField`` that, under a ``BulkUpsertListSerializer``,
+    resolves keys from the objects the list looked up for all its items at
+    once instead of querying per item.
+    """
+
+    def to_internal_value(self, data):
+        related = getattr(self.root, 'related_objects', {})
+        if self.field_name not in related:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            obj = related[self.field_name].get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class BulkUpsertListSerializer(serializers.ListSerializer):
+    """
+    Validates and saves a list of objects in batches. Related keys are
+    looked up with one ``IN`` query for the whole list, and rows are
+    upserted with ``bulk_create`` on the child's ``natural_key``, updating
+    its ``upsert_fields``, which an item replaces like a ``PUT``. When the
+    list repeats a natural key, the last item wins. Sends
+    ``rows_upserted`` since no ``save()`` runs.
+    """
+
+    def to_internal_value(self, data):
+        self.related_objects = {}
+        items = [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+        for name, field in self.child.fields.items():
+            if not isinstance(field, BatchedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            keys = set()
+            for item in items:
+                value = item.get(name)
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    keys.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+            self.related_objects[name] = field.get_queryset().in_bulk(keys)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        natural_key = self.child.natural_key
+        rows = {}
+        for attrs in validated_data:
+            key = tuple(getattr(attrs[name], 'pk', attrs[name]) for name in natural_key)
+            rows[key] = model(**attrs)
+        instances = list(rows.values())
+
+        related = [
+            field.source for field in self.child.fields.values() if isinstance(field, BatchedPrimaryKeyRelatedField)
+        ]
+        with transaction.atomic():
+            model.objects.bulk_create(
+                instances,
+                batch_size=settings.CATALOG_BULK_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=natural_key,
+                update_fields=self.child.upsert_fields,
+            )
+            # Re-read so rows that already existed report their stored
+            # created_at rather than the unsaved one.
+            saved = model.objects.select_related(*related).in_bulk([instance.pk for instance in instances])
+            instances = [saved[instance.pk] for instance in instances]
+            rows_upserted.send(sender=model, instances=instances)
+        return instances
 
 
 class SupplierSerializer(serializers.ModelSerializer):
     class Meta:
         model = Supplier
-        fields = ['id', 'name', 'contact_info', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'contact_info', 'default_reorder_point', 'created_at', 'updated_at']
 
 
 class ProductSerializer(serializers.ModelSerializer):
     supplier = SupplierSerializer(read_only=True)
-    supplier_id = serializers.PrimaryKeyRelatedField(
+    supplier_id = BatchedPrimaryKeyRelatedField(
         queryset=Supplier.objects.all(),
         source="supplier",
         write_only=True
@@ -18,7 +102,31 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'supplier', 'supplier_id', 'created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'description', 'price', 'reorder_point', 'supplier', 'supplier_id', 'created_at', 'updated_at'
+        ]
+
+
+class SupplierUpsertSerializer(SupplierSerializer):
+    """Items of a bulk supplier upsert, keyed by name."""
+    natural_key = ['name']
+    upsert_fields = ['contact_info', 'default_reorder_point', 'updated_at']
+
+    class Meta(SupplierSerializer.Meta):
+        list_serializer_class = BulkUpsertListSerializer
+        # Existing names are updated rather than rejected.
+        extra_kwargs = {'name': {'validators': []}}
+
+
+class ProductUpsertSerializer(ProductSerializer):
+    """Items of a bulk product upsert, keyed by supplier and name."""
+    natural_key = ['supplier', 'name']
+    upsert_fields = ['description', 'price', 'reorder_point', 'updated_at']
+
+    class Meta(ProductSerializer.Meta):
+        list_serializer_class = BulkUpsertListSerializer
+        # Existing (supplier, name) pairs are updated rather than rejected.
+        validators = []
 
 
 class InventorySerializer(serializers.ModelSerializer):
@@ -31,4 +139,64 @@ class InventorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Inventory
-        fields = ['id', 'product', 'product_id', 'quantity', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'product', 'product_id', 'quantity', 'created_at', 'updated_at']
+
+
+class ReorderItemSerializer(InventorySerializer):
+    reorder_point = serializers.IntegerField(read_only=True)
+
+    class Meta(InventorySerializer.Meta):
+        fields = InventorySerializer.Meta.fields + ['reorder_point']
+
+
+class SupplierStockSummarySerializer(serializers.ModelSerializer):
+    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+
+    class Meta:
+        model = SupplierStockSummary
+        fields = [
+            'supplier_id', 'supplier_name', 'product_count', 'units', 'stock_value', 'below_reorder_point',
+            'stale', 'refreshed_at'
+        ]
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Progress of a CSV import. Counters come from the ``ImportJob`` row the
+    import tasks update once per chunk; state and final result come from the
+    django_celery_results ``TaskResult`` passed in as ``task_result``.
+    """
+    status = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'task_id', 'file_name', 'status', 'rows_read', 'rows_committed', 'error_count',
+            'rows_per_second', 'started_at', 'finished_at', 'result', 'created_at', 'updated_at'
+        ]
+
+    def get_status(self, obj):
+        task_result = self.context.get('task_result')
+        if task_result is not None:
+            return task_result.status
+        if obj.finished_at:
+            return states.SUCCESS
+        if obj.started_at:
+            return states.STARTED
+        return states.PENDING
+
+    def get_rows_per_second(self, obj):
+        if not obj.started_at:
+            return None
+        elapsed = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(obj.rows_read / elapsed, 1)
+
+    def get_result(self, obj):
+        task_result = self.context.get('task_result')
+        if task_result is None or task_result.status != states.SUCCESS or not task_result.result:
+            return None
+        return json.loads(task_result.result)
@@ -1,14 +1,94 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Inventory
-from .tasks import send_low_stock_alert
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from . import cache as api_cache
+from .alerts import record_low_stock
+from .ledger import record_movements
+from .summaries import mark_stale_on_commit
+from .models import Inventory, Product, Supplier, Tombstone
+
+# Sent by code that changes inventory in bulk without calling save(), with
+# ``changes``: a list of ``(product_id, previous_quantity, quantity)``.
+inventory_changed = Signal()
+# Sent after suppliers or products are created or updated in bulk without
+# calling save(), with ``instances``: the saved rows.
+rows_upserted = Signal()
+
+
+@receiver(post_save, sender=Inventory)
+def record_stock_change(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_quantity', None)
+    instance._loaded_quantity = instance.quantity
+    changes = [(instance.product_id, previous, instance.quantity)]
+    record_low_stock(changes)
+    record_movements(changes)
+
+
+@receiver(inventory_changed)
+def record_stock_changes_in_bulk(sender, changes, **kwargs):
+    record_low_stock(changes)
+    record_movements(changes)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_supplier_cache(sender, instance, **kwargs):
+    api_cache.object_changed('supplier', instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    api_cache.object_changed('product', instance.pk, {'inventory': instance.pk})
 
 
 @receiver(post_save, sender=Inventory)
-def check_low_stock(sender, instance, **kwargs):
-    if instance.quantity < 10:
-        send_low_stock_alert.delay(
-            product_name=instance.product.name,
-            supplier_name=instance.product.supplier.name,
-            quantity=instance.quantity
-        )
+@receiver(post_delete, sender=Inventory)
+def invalidate_inventory_cache(sender, instance, **kwargs):
+    api_cache.object_changed('inventory', instance.product_id)
+
+
+@receiver(inventory_changed)
+def invalidate_inventory_cache_in_bulk(sender, changes, **kwargs):
+    api_cache.resource_changed('inventory')
+
+
+@receiver(post_save, sender=Supplier)
+def mark_supplier_summary_stale(sender, instance, **kwargs):
+    mark_stale_on_commit(supplier_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def mark_product_supplier_summaries_stale(sender, instance, **kwargs):
+    supplier_ids = {instance.supplier_id, getattr(instance, '_loaded_supplier_id', None)}
+    mark_stale_on_commit(supplier_ids=[supplier_id for supplier_id in supplier_ids if supplier_id is not None])
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def mark_inventory_supplier_summary_stale(sender, instance, **kwargs):
+    mark_stale_on_commit(product_ids=[instance.product_id])
+
+
+@receiver(inventory_changed)
+def mark_inventory_supplier_summaries_stale(sender, changes, **kwargs):
+    mark_stale_on_commit(product_ids=[product_id for product_id, _, _ in changes])
+
+
+@receiver(rows_upserted, sender=Supplier)
+def suppliers_upserted(sender, instances, **kwargs):
+    api_cache.resource_changed('supplier')
+    mark_stale_on_commit(supplier_ids=[instance.pk for instance in instances])
+
+
+@receiver(rows_upserted, sender=Product)
+def products_upserted(sender, instances, **kwargs):
+    api_cache.resource_changed('product')
+    mark_stale_on_commit(supplier_ids={instance.supplier_id for instance in instances})
+
+
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Inventory)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(resource=sender._meta.model_name, object_id=instance.pk)
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Inventory, Product
+from .signals import inventory_changed
+
+
+def _parse_entry(entry):
+    """Return ``(product_id, quantity, delta)`` for a bulk entry or raise ``ValueError``."""
+    if not isinstance(entry, dict):
+        raise ValueError('Each entry must be an object')
+    product_id = entry.get('product_id')
+    if product_id is None:
+        raise ValueError('product_id is required')
+    if ('delta' in entry) == ('quantity' in entry):
+        raise ValueError('Provide exactly one of delta or quantity')
+
+    values = []
+    for name in ('product_id', 'quantity', 'delta'):
+        value = entry.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(f'{name} must be an integer')
+        values.append(value)
+    return tuple(values)
+
+
+def apply_stock_adjustments(entries):
+    """
+    Apply a batch of ``{product_id, delta | quantity}`` entries atomically.
+
+    Entries are folded per product in request order, so a ``quantity``
+    followed by a ``delta`` for the same product sets and then adjusts.
+    Every product is then written by a single ``UPDATE ... SET quantity =
+    CASE ...`` per batch. Deltas are applied as ``quantity + delta`` in SQL,
+    so concurrent adjustments from other clients are never lost. Missing
+    inventory rows are created at zero first.
+
+    Returns one result per entry, in order. Successful entries report the
+    product's quantity after the whole batch.
+    """
+    results = [None] * len(entries)
+    parsed = []
+    for index, entry in enumerate(entries):
+        try:
+            parsed.append((index, *_parse_entry(entry)))
+        except ValueError as e:
+            product_id = entry.get('product_id') if isinstance(entry, dict) else None
+            results[index] = {'product_id': product_id, 'status': 'error', 'error': str(e)}
+
+    known = set(
+        Product.objects.filter(id__in={product_id for _, product_id, _, _ in parsed})
+        .values_list('id', flat=True)
+    )
+
+    # product_id -> (absolute base or None, relative delta)
+    adjustments = {}
+    applied = []
+    for index, product_id, quantity, delta in parsed:
+        if product_id not in known:
+            results[index] = {'product_id': product_id, 'status': 'error', 'error': 'Product not found'}
+            continue
+        base, pending = adjustments.get(product_id, (None, 0))
+        if quantity is not None:
+            base, pending = quantity, 0
+        else:
+            pending += delta
+        adjustments[product_id] = (base, pending)
+        applied.append((index, product_id))
+
+    if not adjustments:
+        return results
+
+    now = timezone.now()
+    product_ids = list(adjustments)
+    with transaction.atomic():
+        # Lock the rows (in a fixed order, so batches can't deadlock) until
+        # the batch commits: the quantities read before and after are then
+        # exactly this batch's change, which the stock ledger records.
+        previous = dict(
+            Inventory.objects.select_for_update().filter(product_id__in=product_ids)
+            .order_by('product_id').values_list('product_id', 'quantity')
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(product_id=product_id, quantity=0) for product_id in product_ids if product_id not in previous],
+            ignore_conflicts=True,
+        )
+
+        batch_size = settings.INVENTORY_BULK_BATCH_SIZE
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            whens = []
+            for product_id in batch:
+                base, pending = adjustments[product_id]
+                if base is not None:
+                    value = Value(base + pending)
+                else:
+                    value = F('quantity') + pending
+                whens.append(When(product_id=product_id, then=value))
+            Inventory.objects.filter(product_id__in=batch).update(
+                quantity=Case(*whens, default=F('quantity'), output_field=IntegerField()),
+                updated_at=now,
+            )
+
+        quantities = dict(
+            Inventory.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity')
+        )
+        inventory_changed.send(sender=Inventory, changes=[
+            (product_id, previous.get(product_id), quantities[product_id])
+            for product_id in product_ids
+        ])
+
+    for index, product_id in applied:
+        results[index] = {'product_id': product_id, 'status': 'ok', 'quantity': quantities[product_id]}
+    return results
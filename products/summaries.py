@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Inventory, Product, Supplier, SupplierStockSummary
+
+SUMMARY_FIELDS = ['product_count', 'units', 'stock_value', 'below_reorder_point', 'refreshed_at']
+
+
+def mark_stale(supplier_ids=(), product_ids=()):
+    """
+    Flag the summaries of ``supplier_ids`` and of the suppliers of
+    ``product_ids`` for the next refresh, in one ``UPDATE``.
+    """
+    match = Q()
+    if supplier_ids:
+        match |= Q(supplier_id__in=supplier_ids)
+    if product_ids:
+        match |= Q(supplier_id__in=Subquery(Product.objects.filter(id__in=product_ids).values('supplier_id')))
+    if match:
+        SupplierStockSummary.objects.filter(match, stale=False).update(stale=True)
+
+
+def mark_stale_on_commit(supplier_ids=(), product_ids=()):
+    """
+    :func:`mark_stale` once the current transaction commits. Marking inside
+    the transaction could find the summary already stale and do nothing,
+    letting a refresh clear the flag and read the old rows before the
+    write becomes visible.
+    """
+    supplier_ids, product_ids = list(supplier_ids), list(product_ids)
+    transaction.on_commit(lambda: mark_stale(supplier_ids=supplier_ids, product_ids=product_ids))
+
+
+def _compute(supplier_ids):
+    """Fresh ``SupplierStockSummary`` rows for ``supplier_ids``, from two grouped queries."""
+    product_counts = dict(
+        Product.objects.filter(supplier_id__in=supplier_ids)
+        .values('supplier_id').annotate(count=Count('id')).order_by()
+        .values_list('supplier_id', 'count')
+    )
+    stock = {
+        row['product__supplier_id']: row
+        for row in Inventory.objects.filter(product__supplier_id__in=supplier_ids)
+        .with_reorder_point()
+        .values('product__supplier_id')
+        .annotate(
+            units=Sum('quantity'),
+            stock_value=Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=18, decimal_places=2)),
+            below_reorder_point=Count('id', filter=Q(quantity__lt=F('reorder_point'))),
+        )
+        .order_by()
+    }
+    now = timezone.now()
+    summaries = []
+    for supplier_id in supplier_ids:
+        row = stock.get(supplier_id, {})
+        summaries.append(SupplierStockSummary(
+            supplier_id=supplier_id,
+            product_count=product_counts.get(supplier_id, 0),
+            units=row.get('units') or 0,
+            stock_value=row.get('stock_value') or 0,
+            below_reorder_point=row.get('below_reorder_point') or 0,
+            stale=False,
+            refreshed_at=now,
+        ))
+    return summaries
+
+
+def refresh_summaries(full=False):
+    """
+    Recompute the stale supplier summaries, or all of them with ``full``,
+    creating rows for new suppliers. Each batch is claimed by clearing its
+    ``stale`` flags before reading. Writers mark summaries stale after they
+    commit (see :func:`mark_stale_on_commit`), so a write the refresh could
+    not see marks its supplier stale again for the next run.
+    Returns how many summaries were refreshed.
+    """
+    batch_size = settings.SUPPLIER_SUMMARY_BATCH_SIZE
+    SupplierStockSummary.objects.bulk_create(
+        [
+            SupplierStockSummary(supplier_id=supplier_id)
+            for supplier_id in Supplier.objects.filter(stock_summary__isnull=True).values_list('id', flat=True)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    summaries = SupplierStockSummary.objects.all() if full else SupplierStockSummary.objects.filter(stale=True)
+    supplier_ids = list(summaries.order_by('supplier_id').values_list('supplier_id', flat=True))
+
+    for start in range(0, len(supplier_ids), batch_size):
+        batch = supplier_ids[start:start + batch_size]
+        with transaction.atomic():
+            SupplierStockSummary.objects.filter(supplier_id__in=batch).update(stale=False)
+            SupplierStockSummary.objects.bulk_create(
+                _compute(batch),
+                update_conflicts=True,
+                unique_fields=['supplier'],
+                update_fields=SUMMARY_FIELDS,
+            )
+    return len(supplier_ids)
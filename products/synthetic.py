@@ -0,0 +1,99 @@
+import csv
+import random
+from decimal import Decimal
+
+from .models import Inventory, Product, Supplier
+
+SUPPLIER_NAME = 'Synthetic Supplier {}'
+PRODUCT_NAME = 'Synthetic Product {}'
+
+CSV_FIELDS = ['supplier_name', 'supplier_contact', 'product_name', 'description', 'price', 'quantity']
+
+
+def supplier_name(index):
+    return SUPPLIER_NAME.format(index)
+
+
+def product_name(index):
+    return PRODUCT_NAME.format(index)
+
+
+def product_supplier(index, supplier_count):
+    """Index of the supplier that synthetic product ``index`` belongs to."""
+    return index % supplier_count
+
+
+def _price(rng):
+    return Decimal(rng.randrange(100, 100000)) / 100
+
+
+def synthetic_data_exists():
+    return Supplier.objects.filter(name=supplier_name(0)).exists()
+
+
+def generate_catalogue(supplier_count, product_count, seed=0, batch_size=10000, progress=None):
+    """
+    Insert ``supplier_count`` suppliers and ``product_count`` products, each
+    with an inventory row, in batches of ``batch_size``.
+
+    The data is a function of the counts and ``seed`` only, so two databases
+    generated with the same arguments hold the same rows. Products are
+    created a batch at a time, so memory use does not grow with
+    ``product_count``. ``progress`` is called with the number of products
+    written so far after each batch.
+    """
+    rng = random.Random(seed)
+    supplier_ids = []
+    for start in range(0, supplier_count, batch_size):
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(name=supplier_name(index), contact_info=f'supplier{index}@example.com')
+            for index in range(start, min(start + batch_size, supplier_count))
+        ])
+        supplier_ids.extend(supplier.pk for supplier in suppliers)
+
+    for start in range(0, product_count, batch_size):
+        products = Product.objects.bulk_create([
+            Product(
+                name=product_name(index),
+                description=f'Synthetic product number {index}',
+                price=_price(rng),
+                supplier_id=supplier_ids[product_supplier(index, supplier_count)],
+            )
+            for index in range(start, min(start + batch_size, product_count))
+        ])
+        Inventory.objects.bulk_create([
+            Inventory(product_id=product.pk, quantity=rng.randrange(0, 500))
+            for product in products
+        ])
+        if progress is not None:
+            progress(start + len(products))
+
+
+def write_csv(file, row_count, supplier_count, product_count, seed=0, update_ratio=0.5):
+    """
+    Write a supplier feed in the upload format to the text ``file``.
+
+    About ``update_ratio`` of the rows restock products from the generated
+    catalogue; the rest introduce products numbered after it, as a new
+    feed would. Rows are streamed, so files of millions of rows can be
+    written without holding them in memory.
+    """
+    rng = random.Random(seed)
+    writer = csv.writer(file)
+    writer.writerow(CSV_FIELDS)
+    new_index = product_count
+    for _ in range(row_count):
+        if product_count and rng.random() < update_ratio:
+            index = rng.randrange(product_count)
+        else:
+            index = new_index
+            new_index += 1
+        supplier_index = product_supplier(index, supplier_count)
+        writer.writerow([
+            supplier_name(supplier_index),
+            f'supplier{supplier_index}@example.com',
+            product_name(index),
+            f'Synthetic product number {index}',
+            _price(rng),
+            rng.randrange(0, 500),
+        ])
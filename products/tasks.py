@@ -1,55 +1,96 @@
-import csv
-import io
-from .models import Product, Inventory, Supplier
-from celery import shared_task
+import math
+import os
+from . import changes, ledger, summaries
+from .importer import CsvImporter, iter_csv_rows, merge_results, split_csv_file
+from .models import ImportJob, LowStockAlert
+from celery import shared_task, chord, group
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 import logging
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 
 
 @shared_task
-def process_csv_file(file_content, encoding='utf-8'):
-    results = {
-        'processed': 0,
-        'errors': []
-    }
+def process_csv_file(file_path, encoding='utf-8', job_id=None):
+    progress = None
+    if job_id is not None:
+        def progress(rows_read, rows_committed, error_count):
+            ImportJob.objects.filter(task_id=job_id).update(
+                rows_read=F('rows_read') + rows_read,
+                rows_committed=F('rows_committed') + rows_committed,
+                error_count=F('error_count') + error_count,
+            )
+
+    importer = CsvImporter(progress=progress)
 
     try:
-        csv_file = io.StringIO(file_content.decode(encoding))
-        reader = csv.DictReader(csv_file)
-
-        for row_num, row in enumerate(reader, start=1):
-            try:
-                supplier, _ = Supplier.objects.get_or_create(
-                    name=row['supplier_name'],
-                    defaults={'contact_info': row.get('supplier_contact', '')}
-                )
-
-                product, created = Product.objects.get_or_create(
-                    name=row['product_name'],
-                    supplier=supplier,
-                    defaults={
-                        'description': row.get('description', ''),
-                        'price': float(row['price'])
-                    }
-                )
-
-                if 'quantity' in row:
-                    Inventory.objects.update_or_create(
-                        product=product,
-                        defaults={'quantity': int(row['quantity'])}
-                    )
-
-                results['processed'] += 1
-
-            except Exception as e:
-                results['errors'].append(f"Row {row_num}: {str(e)}")
-
-        return results
+        importer.run(iter_csv_rows(file_path, encoding))
+
+    except Exception as e:
+        importer.results['errors'].append(f"File processing error: {str(e)}")
+
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            logger.warning(f"Could not remove spooled CSV file {file_path}")
+
+    return importer.results
+
+
+@shared_task(bind=True)
+def import_csv_file(self, file_path, encoding='utf-8'):
+    """
+    Coordinate the import of a spooled CSV upload.
+
+    Small files are imported in this task. Larger ones are split into shards
+    that are imported in parallel by a chord; this task is replaced by that
+    chord, so its id resolves to the merged result.
+    """
+    job_id = self.request.id
+    ImportJob.objects.filter(task_id=job_id).update(started_at=timezone.now())
+
+    try:
+        file_size = os.path.getsize(file_path)
+    except OSError as e:
+        results = {'processed': 0, 'errors': [f"File processing error: {str(e)}"]}
+        return finish_import_job(job_id, results)
+
+    shard_count = min(
+        settings.CSV_IMPORT_MAX_SHARDS,
+        math.ceil(file_size / settings.CSV_IMPORT_SHARD_SIZE),
+    )
+    if shard_count <= 1:
+        results = process_csv_file(file_path, encoding, job_id=job_id)
+        return finish_import_job(job_id, results)
 
+    try:
+        shard_paths = split_csv_file(file_path, shard_count, encoding)
     except Exception as e:
-        results['errors'].append(f"File processing error: {str(e)}")
-        return results
+        results = {'processed': 0, 'errors': [f"File processing error: {str(e)}"]}
+        return finish_import_job(job_id, results)
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            logger.warning(f"Could not remove spooled CSV file {file_path}")
+
+    return self.replace(chord(
+        group(process_csv_file.s(shard_path, job_id=job_id) for shard_path in shard_paths),
+        merge_import_results.s(job_id=job_id),
+    ))
+
+
+@shared_task
+def merge_import_results(shard_results, job_id=None):
+    return finish_import_job(job_id, merge_results(shard_results))
+
+
+def finish_import_job(job_id, results):
+    if job_id is not None:
+        ImportJob.objects.filter(task_id=job_id).update(finished_at=timezone.now())
+    return results
 
 
 logger = logging.getLogger(__name__)
@@ -66,7 +107,75 @@ def send_low_stock_alert(product_name, supplier_name, quantity):
             subject='Low Stock Alert',
             message=message,
             from_email=settings.EMAIL_HOST_USER,
-            recipient_list=['t.solesi@fusioncl.com'],
+            recipient_list=settings.LOW_STOCK_ALERT_RECIPIENTS,
         )
     except Exception as e:
         logger.error(f"Failed to send low stock alert email for {product_name}: {str(e)}")
+
+
+@shared_task
+def send_low_stock_digest():
+    """
+    Send every pending low stock alert as one email over one SMTP
+    connection and mark them sent. Scheduled by Celery beat.
+    """
+    alerts = list(
+        LowStockAlert.objects.filter(sent_at__isnull=True)
+        .select_related('product__supplier', 'product__inventory')
+        .order_by('product__supplier__name', 'product__name')[:settings.LOW_STOCK_DIGEST_MAX_ITEMS]
+    )
+    if not alerts:
+        return 0
+
+    lines = []
+    for alert in alerts:
+        product = alert.product
+        inventory = getattr(product, 'inventory', None)
+        quantity = inventory.quantity if inventory is not None else alert.quantity
+        lines.append(
+            f"- '{product.name}' supplied by '{product.supplier.name}': "
+            f"{quantity} in stock (threshold {alert.threshold})"
+        )
+    message = (
+        f"{len(alerts)} product(s) have low stock.\n\n" + "\n".join(lines)
+    )
+
+    try:
+        with get_connection() as connection:
+            EmailMessage(
+                subject='Low Stock Alert',
+                body=message,
+                from_email=settings.EMAIL_HOST_USER,
+                to=settings.LOW_STOCK_ALERT_RECIPIENTS,
+                connection=connection,
+            ).send()
+    except Exception as e:
+        logger.error(f"Failed to send low stock digest for {len(alerts)} product(s): {str(e)}")
+        return 0
+
+    LowStockAlert.objects.filter(id__in=[alert.id for alert in alerts]).update(sent_at=timezone.now())
+    return len(alerts)
+
+
+@shared_task
+def prune_tombstones():
+    """Delete change feed tombstones past their retention. Scheduled by Celery beat."""
+    return changes.prune_tombstones()
+
+
+@shared_task
+def take_stock_snapshots():
+    """Snapshot the stock of products that moved since the last run. Scheduled by Celery beat."""
+    return ledger.take_snapshots()
+
+
+@shared_task
+def compact_stock_ledger():
+    """Fold stock history past its retention into baseline snapshots. Scheduled by Celery beat."""
+    return ledger.compact()
+
+
+@shared_task
+def refresh_supplier_summaries(full=False):
+    """Recompute stale supplier stock summaries, or all with ``full``. Scheduled by Celery beat."""
+    return summaries.refresh_summaries(full=full)
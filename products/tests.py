@@ -1,9 +1,36 @@
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from decimal import Decimal
-from .models import Product, Supplier, Inventory
+from .models import Product, Supplier, Inventory, ImportJob, LowStockAlert, StockMovement, StockSnapshot, SupplierStockSummary, Tombstone
 from django.core.files.uploadedfile import SimpleUploadedFile
+from inventoryms.celery import record_task_end, record_task_start, stamp_published_at
+from . import changes, ledger, metrics, summaries
+from .benchmarks import ENDPOINTS, benchmark_serialization
+from .projections import INVENTORY_PROJECTION, PRODUCT_PROJECTION, SUPPLIER_PROJECTION
+from .renderers import FastJSONRenderer
+from .serializers import InventorySerializer, ProductSerializer, SupplierSerializer
+from .importer import CsvImporter, parse_row, resolve_suppliers, split_csv_file
+from .search import search_products
+from .synthetic import write_csv
+from .tasks import import_csv_file, merge_import_results, process_csv_file, send_low_stock_digest
 
 
 class ProductAPITests(APITestCase):
@@ -136,7 +163,33 @@ class InventoryAPITests(APITestCase):
     def test_get_inventory(self):
         response = self.client.get(self.inventory_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)  # Check pagination
+
+    def test_get_inventory_with_cursor(self):
+        for index in range(4):
+            product = Product.objects.create(
+                name=f"Product {index}",
+                description="Description",
+                price=Decimal("1.00"),
+                supplier=self.supplier
+            )
+            Inventory.objects.create(product=product, quantity=10 + index)
+
+        seen = []
+        response = self.client.get(self.inventory_url, {'cursor': '', 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, list(Inventory.objects.order_by('updated_at', 'id').values_list('id', flat=True)))
+
+    def test_get_inventory_with_invalid_cursor(self):
+        response = self.client.get(self.inventory_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_update_inventory(self):
         data = {
@@ -148,6 +201,64 @@ class InventoryAPITests(APITestCase):
         self.assertEqual(Inventory.objects.get(product=self.product).quantity, 20)
 
 
+class InventoryBulkAdjustTests(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Test Supplier",
+            contact_info="test@supplier.com"
+        )
+        self.products = [
+            Product.objects.create(
+                name=f"Product {index}",
+                description="Description",
+                price=Decimal("1.00"),
+                supplier=self.supplier
+            )
+            for index in range(3)
+        ]
+        Inventory.objects.create(product=self.products[0], quantity=50)
+        Inventory.objects.create(product=self.products[1], quantity=50)
+        self.url = reverse('inventory-bulk-adjust')
+
+    def test_bulk_adjust(self):
+        first, second, third = self.products
+        data = [
+            {'product_id': first.id, 'delta': -5},
+            {'product_id': first.id, 'delta': -5},
+            {'product_id': second.id, 'quantity': 20},
+            {'product_id': second.id, 'delta': 5},
+            {'product_id': third.id, 'delta': 30},
+            {'product_id': 999999, 'delta': 1},
+            {'product_id': first.id, 'delta': 1, 'quantity': 1},
+        ]
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['ok'] * 5 + ['error'] * 2)
+        self.assertEqual(results[1]['quantity'], 40)
+        self.assertEqual(results[3]['quantity'], 25)
+        self.assertEqual(results[5]['error'], 'Product not found')
+        self.assertEqual(Inventory.objects.get(product=first).quantity, 40)
+        self.assertEqual(Inventory.objects.get(product=second).quantity, 25)
+        self.assertEqual(Inventory.objects.get(product=third).quantity, 30)
+
+    def test_bulk_adjust_query_count_is_independent_of_batch_size(self):
+        data = [{'product_id': product.id, 'delta': 10} for product in self.products]
+        self.client.post(self.url, data, format='json')
+        # Including one insert into the stock ledger and one update marking
+        # supplier summaries stale after commit.
+        with self.assertNumQueries(8), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data, format='json')
+        with self.assertNumQueries(8), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data * 50, format='json')
+
+    def test_bulk_adjust_requires_list(self):
+        response = self.client.post(self.url, {'product_id': 1, 'delta': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class FileUploadTests(APITestCase):
     def setUp(self):
         self.upload_url = reverse('file-upload')
@@ -169,6 +280,68 @@ class FileUploadTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         self.assertTrue('task_id' in response.data)
 
+    def test_upload_spools_file_and_sends_path(self):
+        file = SimpleUploadedFile(
+            "test.csv",
+            self.csv_content,
+            content_type="text/csv"
+        )
+
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                override_settings(CSV_IMPORT_SPOOL_DIR=spool_dir), \
+                mock.patch('products.views.import_csv_file.apply_async') as apply_async:
+            apply_async.side_effect = lambda args, task_id: mock.Mock(id=task_id)
+            response = self.client.post(
+                self.upload_url,
+                {'file': file},
+                format='multipart'
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertTrue(ImportJob.objects.filter(task_id=response.data['task_id']).exists())
+            (file_path,) = apply_async.call_args.kwargs['args']
+            self.assertEqual(os.path.dirname(file_path), spool_dir)
+            with open(file_path, 'rb') as spooled:
+                self.assertEqual(spooled.read(), self.csv_content)
+
+    def test_import_job_progress(self):
+        job = ImportJob.objects.create(task_id='job-1', file_name='feed.csv')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(
+                "supplier_name,product_name,price,quantity\n"
+                "Acme,Widget,1.00,20\n"
+                "Acme,Gadget,bad,20\n"
+            )
+
+        process_csv_file(csv_file.name, job_id=job.task_id)
+
+        response = self.client.get(reverse('import-job-detail', kwargs={'task_id': job.task_id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rows_read'], 2)
+        self.assertEqual(response.data['rows_committed'], 1)
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['status'], 'PENDING')
+
+    @override_settings(CSV_IMPORT_SHARD_SIZE=1)
+    def test_failed_split_finishes_job_even_if_spool_cannot_be_removed(self):
+        job = ImportJob.objects.create(task_id='job-2', file_name='feed.csv')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write("supplier_name,product_name,price,quantity\n")
+
+        with mock.patch('products.tasks.split_csv_file', side_effect=OSError('unreadable')), \
+                mock.patch('products.tasks.os.remove', side_effect=OSError('gone')), \
+                self.assertLogs('products.tasks', 'WARNING'):
+            results = import_csv_file.apply(args=[csv_file.name], task_id=job.task_id).get()
+        os.remove(csv_file.name)
+
+        self.assertEqual(results['errors'], ['File processing error: unreadable'])
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+
+    def test_import_job_not_found(self):
+        response = self.client.get(reverse('import-job-detail', kwargs={'task_id': 'missing'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_upload_non_csv(self):
         file = SimpleUploadedFile(
             "test.txt",
@@ -187,3 +360,1339 @@ class FileUploadTests(APITestCase):
     def test_upload_no_file(self):
         response = self.client.post(self.upload_url, {}, format='multipart')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CsvImportTests(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Acme",
+            contact_info="acme@supplier.com"
+        )
+        self.product = Product.objects.create(
+            name="Widget",
+            description="Existing widget",
+            price=Decimal("5.00"),
+            supplier=self.supplier
+        )
+        Inventory.objects.create(product=self.product, quantity=50)
+
+    def import_csv(self, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(content)
+        results = process_csv_file(csv_file.name)
+        self.assertFalse(os.path.exists(csv_file.name))
+        return results
+
+    def test_import_creates_and_reuses_rows(self):
+        results = self.import_csv(
+            "supplier_name,supplier_contact,product_name,description,price,quantity\n"
+            "Acme,ignored,Widget,Ignored,1.00,40\n"
+            "Acme,ignored,Gadget,New gadget,2.50,30\n"
+            "Globex,globex@supplier.com,Gadget,Other gadget,3.00,20\n"
+            "Globex,globex@supplier.com,Gadget,Other gadget,3.00,25\n"
+        )
+
+        self.assertEqual(results, {'processed': 4, 'errors': []})
+        self.assertEqual(Supplier.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(Inventory.objects.get(product=self.product).quantity, 40)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).description, "Existing widget")
+        globex_gadget = Product.objects.get(name="Gadget", supplier__name="Globex")
+        self.assertEqual(globex_gadget.price, Decimal("3.00"))
+        self.assertEqual(globex_gadget.inventory.quantity, 25)
+
+    def test_import_reports_row_errors(self):
+        results = self.import_csv(
+            "supplier_name,product_name,price,quantity\n"
+            "Acme,Gadget,not-a-price,10\n"
+            "Acme,Gizmo,4.00,12\n"
+        )
+
+        self.assertEqual(results['processed'], 1)
+        self.assertEqual(
+            results['errors'],
+            ["Row 1: could not convert string to float: 'not-a-price'"]
+        )
+        self.assertTrue(Product.objects.filter(name="Gizmo").exists())
+
+    def test_natural_keys_are_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Supplier.objects.create(name="Acme", contact_info="")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.create(name="Widget", price=Decimal("1.00"), supplier=self.supplier)
+
+    def test_rows_created_concurrently_resolve_to_existing_ids(self):
+        # Simulate another import inserting the rows between the lookup and
+        # the insert: the upsert must hand back the existing ids.
+        with mock.patch.object(Supplier.objects, 'filter', return_value=Supplier.objects.none()):
+            self.assertEqual(resolve_suppliers({"Acme": ""}), {"Acme": self.supplier.pk})
+        with mock.patch.object(Product.objects, 'filter', return_value=Product.objects.none()):
+            products = CsvImporter().resolve_products(
+                [parse_row(1, {'supplier_name': "Acme", 'product_name': "Widget", 'price': "1.00"})],
+                {"Acme": self.supplier.pk},
+            )
+        self.assertEqual(products, {("Widget", self.supplier.pk): self.product.pk})
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_import_query_count_is_independent_of_row_count(self):
+        header = "supplier_name,product_name,description,price,quantity\n"
+        rows = "".join(
+            f"Supplier {i % 3},Product {i},Description,1.00,{20 + i}\n"
+            for i in range(60)
+        )
+        importer = CsvImporter(chunk_size=100)
+        reader = csv.DictReader(io.StringIO(header + rows))
+
+        # Including one insert into the stock ledger and two updates marking
+        # supplier summaries stale after commit (for new products and for stock).
+        with self.assertNumQueries(12), self.captureOnCommitCallbacks(execute=True):
+            importer.run(enumerate(reader, start=1))
+
+        self.assertEqual(importer.results['processed'], 60)
+        self.assertEqual(Inventory.objects.count(), 61)
+
+    def test_sharded_import_matches_single_file_import(self):
+        content = (
+            "supplier_name,supplier_contact,product_name,description,price,quantity\n"
+            + "".join(
+                f"Supplier {i % 4},s{i % 4}@supplier.com,Product {i % 20},Description,1.00,{20 + i}\n"
+                for i in range(100)
+            )
+            + "Supplier 1,s1@supplier.com,Broken,Description,oops,10\n"
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(content)
+
+        shard_paths = split_csv_file(csv_file.name, 3)
+        os.remove(csv_file.name)
+        self.assertEqual(Supplier.objects.count(), 5)
+
+        results = merge_import_results([process_csv_file(path) for path in shard_paths])
+
+        self.assertEqual(results['processed'], 100)
+        self.assertEqual(results['errors'], ["Row 101: could not convert string to float: 'oops'"])
+        self.assertEqual(Supplier.objects.count(), 5)
+        self.assertEqual(Product.objects.count(), 1 + 20)
+        self.assertEqual(
+            Inventory.objects.get(product__name="Product 3", product__supplier__name="Supplier 3").quantity,
+            20 + 83
+        )
+        self.assertFalse(any(os.path.exists(path) for path in shard_paths))
+
+
+class QueryCountTests(APITestCase):
+    """
+    Guards against N+1 queries: every read endpoint must issue the same
+    number of queries whether it renders one row or many.
+    """
+
+    def create_rows(self, count):
+        for _ in range(count):
+            index = Supplier.objects.count()
+            supplier = Supplier.objects.create(name=f"Supplier {index}", contact_info="contact")
+            product = Product.objects.create(
+                name=f"Product {index}",
+                description="Description",
+                price=Decimal("1.00"),
+                supplier=supplier
+            )
+            Inventory.objects.create(product=product, quantity=20)
+        return product
+
+    def assertConstantQueries(self, url):
+        self.create_rows(1)
+        with CaptureQueriesContext(connection) as single:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.create_rows(5)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            len(single), len(many),
+            f"{url} issued {len(single)} queries for 1 row but {len(many)} for 6"
+        )
+
+    def test_product_list(self):
+        self.assertConstantQueries(reverse('product-list-create'))
+
+    def test_supplier_list(self):
+        self.assertConstantQueries(reverse('supplier-list-create'))
+
+    def test_inventory_list(self):
+        self.assertConstantQueries(reverse('inventory-update'))
+
+    def test_detail_endpoints(self):
+        # One query reads the updated_at columns for the ETag, one the row.
+        product = self.create_rows(1)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('product-detail', kwargs={'pk': product.pk}))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('supplier-detail', kwargs={'pk': product.supplier_id}))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('inventory-update'), {'product_id': product.pk})
+
+
+class LowStockAlertTests(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Test Supplier",
+            contact_info="test@supplier.com"
+        )
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Description",
+            price=Decimal("99.99"),
+            supplier=self.supplier
+        )
+        self.inventory = Inventory.objects.create(product=self.product, quantity=20)
+
+    def test_alert_recorded_once_per_threshold_crossing(self):
+        inventory = Inventory.objects.get(pk=self.inventory.pk)
+        inventory.quantity = 5
+        inventory.save()
+        inventory.quantity = 3
+        inventory.save()
+
+        self.assertEqual(LowStockAlert.objects.filter(product=self.product).count(), 1)
+
+    def test_alerts_deduplicated_within_window(self):
+        url = reverse('inventory-bulk-adjust')
+        self.client.post(url, [{'product_id': self.product.id, 'quantity': 5}], format='json')
+        self.client.post(url, [{'product_id': self.product.id, 'quantity': 50}], format='json')
+        self.client.post(url, [{'product_id': self.product.id, 'quantity': 4}], format='json')
+
+        self.assertEqual(LowStockAlert.objects.filter(product=self.product).count(), 1)
+
+    def test_digest_sends_one_email_and_marks_alerts_sent(self):
+        for index in range(3):
+            product = Product.objects.create(
+                name=f"Product {index}",
+                description="Description",
+                price=Decimal("1.00"),
+                supplier=self.supplier
+            )
+            Inventory.objects.create(product=product, quantity=index)
+
+        self.assertEqual(send_low_stock_digest(), 3)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("'Product 2' supplied by 'Test Supplier': 2 in stock", mail.outbox[0].body)
+        self.assertFalse(LowStockAlert.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(send_low_stock_digest(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ReorderPointTests(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Test Supplier",
+            contact_info="test@supplier.com",
+            default_reorder_point=20
+        )
+        self.url = reverse('inventory-reorder')
+
+    def create_item(self, name, quantity, reorder_point=None, supplier=None):
+        product = Product.objects.create(
+            name=name,
+            description="Description",
+            price=Decimal("1.00"),
+            supplier=supplier or self.supplier,
+            reorder_point=reorder_point
+        )
+        Inventory.objects.create(product=product, quantity=quantity)
+        return product
+
+    def test_reorder_list_uses_product_then_supplier_reorder_point(self):
+        self.create_item("Above supplier default", 25)
+        below_default = self.create_item("Below supplier default", 15)
+        self.create_item("Above own point", 15, reorder_point=5)
+        below_own = self.create_item("Below own point", 40, reorder_point=50)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['product']['id'], item['reorder_point']) for item in response.data['results']],
+            [(below_default.id, 20), (below_own.id, 50)]
+        )
+
+    def test_reorder_list_is_one_query_per_page(self):
+        for index in range(5):
+            self.create_item(f"Product {index}", index)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_reorder_list_filters_by_supplier(self):
+        other = Supplier.objects.create(name="Other Supplier", contact_info="other@supplier.com")
+        self.create_item("Ours", 1)
+        theirs = self.create_item("Theirs", 1, supplier=other)
+
+        response = self.client.get(self.url, {'supplier_id': other.id})
+        self.assertEqual([item['product']['id'] for item in response.data['results']], [theirs.id])
+
+        response = self.client.get(self.url, {'supplier_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Invalid supplier_id: abc'})
+
+    def test_low_stock_alert_uses_reorder_point(self):
+        product = self.create_item("Custom point", 60, reorder_point=50)
+        inventory = Inventory.objects.get(product=product)
+        inventory.quantity = 45
+        inventory.save()
+
+        alert = LowStockAlert.objects.get(product=product)
+        self.assertEqual(alert.threshold, 50)
+
+
+class ApiCacheTests(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(
+            name="Test Supplier",
+            contact_info="test@supplier.com"
+        )
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Description",
+            price=Decimal("99.99"),
+            supplier=self.supplier
+        )
+        Inventory.objects.create(product=self.product, quantity=20)
+        self.detail_url = reverse('product-detail', kwargs={'pk': self.product.pk})
+
+    def test_detail_is_served_from_cache(self):
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['name'], 'Test Product')
+
+        stats = self.client.get(reverse('cache-stats')).data
+        self.assertGreaterEqual(stats['hits'], 1)
+        self.assertGreaterEqual(stats['misses'], 1)
+
+    def test_save_invalidates_object_and_lists(self):
+        list_url = reverse('product-list-create')
+        self.client.get(self.detail_url)
+        self.client.get(list_url)
+
+        self.product.name = 'Renamed Product'
+        self.product.save()
+
+        self.assertEqual(self.client.get(self.detail_url).data['name'], 'Renamed Product')
+        self.assertEqual(self.client.get(list_url).data['results'][0]['name'], 'Renamed Product')
+
+    def test_supplier_change_invalidates_embedding_payloads(self):
+        inventory_url = reverse('inventory-update')
+        self.client.get(self.detail_url)
+        self.client.get(inventory_url, {'product_id': self.product.pk})
+
+        self.supplier.name = 'Renamed Supplier'
+        self.supplier.save()
+
+        self.assertEqual(self.client.get(self.detail_url).data['supplier']['name'], 'Renamed Supplier')
+        response = self.client.get(inventory_url, {'product_id': self.product.pk})
+        self.assertEqual(response.data['product']['supplier']['name'], 'Renamed Supplier')
+
+    def test_bulk_adjustment_invalidates_inventory(self):
+        inventory_url = reverse('inventory-update')
+        self.client.get(inventory_url, {'product_id': self.product.pk})
+
+        self.client.post(
+            reverse('inventory-bulk-adjust'),
+            [{'product_id': self.product.pk, 'delta': 5}],
+            format='json'
+        )
+
+        response = self.client.get(inventory_url, {'product_id': self.product.pk})
+        self.assertEqual(response.data['quantity'], 25)
+
+    def test_inventory_lookup_is_cached_under_canonical_id(self):
+        inventory_url = reverse('inventory-update')
+        padded_id = f'0{self.product.pk}'
+        self.assertEqual(self.client.get(inventory_url, {'product_id': padded_id}).data['quantity'], 20)
+
+        self.client.post(inventory_url, {'product_id': self.product.pk, 'quantity': 3}, format='json')
+
+        self.assertEqual(self.client.get(inventory_url, {'product_id': padded_id}).data['quantity'], 3)
+        for url in (inventory_url, reverse('async-inventory')):
+            response = self.client.get(url, {'product_id': 'abc'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {'error': 'Invalid product_id: abc'})
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_generated_data_is_reproducible_and_importable(self):
+        call_command('generate_synthetic_data', suppliers=3, products=25, stdout=io.StringIO())
+        self.assertEqual(Supplier.objects.count(), 3)
+        self.assertEqual(Inventory.objects.count(), 25)
+
+        feeds = []
+        for _ in range(2):
+            feed = io.StringIO()
+            write_csv(feed, 40, supplier_count=3, product_count=25, seed=7)
+            feeds.append(feed.getvalue())
+        self.assertEqual(feeds[0], feeds[1])
+        rows = list(csv.DictReader(io.StringIO(feeds[0])))
+        self.assertEqual(CsvImporter().run(enumerate(rows, start=1))['errors'], [])
+
+    def test_run_benchmarks_writes_json_report(self):
+        call_command('generate_synthetic_data', suppliers=3, products=25, stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'report.json')
+            with override_settings(CSV_IMPORT_SPOOL_DIR=tmp_dir):
+                call_command(
+                    'run_benchmarks', requests=2, import_rows=30, output=output, stdout=io.StringIO(),
+                )
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(report['dataset'], {'suppliers': 3, 'products': 25})
+        self.assertEqual(report['import']['processed'], 30)
+        self.assertEqual(set(report['endpoints']), set(ENDPOINTS))
+        for result in report['endpoints'].values():
+            self.assertEqual(result['count'], 2)
+            self.assertEqual(result['status_codes'], {'200': 2})
+        # Nothing written by the import benchmark is kept.
+        self.assertEqual(Product.objects.count(), 25)
+
+
+class HttpLoadBenchmarkTests(LiveServerTestCase):
+    def test_run_benchmarks_loads_a_running_server(self):
+        call_command('generate_synthetic_data', suppliers=2, products=10, stdout=io.StringIO())
+        output = io.StringIO()
+        call_command(
+            'run_benchmarks', url=self.live_server_url, requests=5, concurrency=2, stdout=output,
+        )
+        report = json.loads(output.getvalue())
+
+        self.assertEqual(report['http']['requests'], 10)
+        self.assertEqual(report['http']['errors'], 0)
+        self.assertGreater(report['http']['requests_per_second'], 0)
+
+
+@override_settings(PERF_SAMPLE_RATE=1)
+class PerformanceMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        Product.objects.create(name="Widget", price=Decimal("5.00"), supplier=supplier)
+
+    def test_sampled_request_has_server_timing_and_feeds_metrics(self):
+        response = self.client.get(reverse('product-list-create'))
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'serialize;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+        metrics_response = self.client.get(reverse('metrics'))
+        self.assertEqual(metrics_response.status_code, status.HTTP_200_OK)
+        self.assertTrue(metrics_response['Content-Type'].startswith('text/plain'))
+        body = metrics_response.content.decode()
+        self.assertIn('# TYPE ims_http_request_duration_seconds histogram', body)
+        self.assertIn('ims_http_request_duration_seconds_count{view="product-list-create"} 1', body)
+        self.assertIn('ims_http_request_db_queries_bucket{view="product-list-create",le="+Inf"} 1', body)
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_instrumented(self):
+        response = self.client.get(reverse('product-list-create'))
+
+        self.assertNotIn('Server-Timing', response)
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertNotIn('view="product-list-create"', body)
+
+    def test_serialization_time_includes_building_the_payload(self):
+        serialize = PRODUCT_PROJECTION.serialize
+
+        def slow_serialize(rows):
+            time.sleep(0.05)
+            return serialize(rows)
+
+        with mock.patch.object(PRODUCT_PROJECTION, 'serialize', side_effect=slow_serialize):
+            response = self.client.get(reverse('product-list-create'))
+
+        serialize_ms = float(re.search(r'serialize;dur=([\d.]+)', response['Server-Timing']).group(1))
+        self.assertGreaterEqual(serialize_ms, 50)
+
+    def test_metrics_outage_does_not_fail_requests(self):
+        with mock.patch.object(metrics.REQUEST_DURATION, 'observe', side_effect=ConnectionError), \
+                self.assertLogs('products.middleware', 'WARNING'):
+            response = self.client.get(reverse('product-list-create'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Server-Timing', response)
+
+
+class TaskMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_import_task_records_runs_duration_and_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(
+                "supplier_name,product_name,price,quantity\n"
+                "Acme,Widget,1.00,5\n"
+                "Acme,Gadget,oops,5\n"
+            )
+        process_csv_file.apply(args=[csv_file.name])
+
+        name = process_csv_file.name
+        self.assertEqual(metrics.TASK_RUNS.values([name]), {name: 1})
+        self.assertEqual(metrics.TASK_ROWS.values([name]), {name: 1})
+        self.assertEqual(metrics.TASK_ROW_ERRORS.values([name]), {name: 1})
+        self.assertEqual(metrics.TASK_DURATION.summary(name)[0], 1)
+        self.assertEqual(metrics.TASK_ROWS_PER_SECOND.summary(name)[0], 1)
+
+        output = io.StringIO()
+        call_command('task_metrics', stdout=output)
+        self.assertIn(name, output.getvalue())
+
+    def test_failed_task_is_counted(self):
+        merge_import_results.apply(args=[None])
+
+        name = merge_import_results.name
+        self.assertEqual(metrics.TASK_FAILURES.values([name]), {name: 1})
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(f'ims_celery_task_failures_total{{task="{name}"}} 1', body)
+
+    def test_queue_wait_is_measured_from_publish_header(self):
+        headers = {}
+        stamp_published_at(headers=headers)
+        task = mock.Mock()
+        task.name = 'products.tasks.send_low_stock_digest'
+        task.request.published_at = headers['published_at'] - 2
+
+        record_task_start(task_id='abc', task=task)
+        record_task_end(task_id='abc', task=task, state='SUCCESS')
+
+        count, total = metrics.TASK_QUEUE_WAIT.summary(task.name)
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(total, 2)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        self.products = [
+            Product.objects.create(name=f"Widget {i}", price=Decimal("5.00"), supplier=supplier)
+            for i in range(12)
+        ]
+        Inventory.objects.create(product=self.products[0], quantity=7)
+
+    def assertSamePayload(self, sync_path, async_path, expected_status=status.HTTP_200_OK):
+        cache.clear()
+        sync_response = self.client.get(sync_path)
+        cache.clear()
+        async_response = self.client.get(async_path)
+        self.assertEqual(async_response.status_code, expected_status)
+        self.assertEqual(sync_response.status_code, expected_status)
+        return sync_response.json(), async_response.json()
+
+    def test_product_list_matches_sync_view(self):
+        sync_data, async_data = self.assertSamePayload(
+            reverse('product-list-create') + '?page=2',
+            reverse('async-product-list') + '?page=2',
+        )
+        self.assertEqual(async_data['count'], 12)
+        self.assertEqual(async_data['results'], sync_data['results'])
+        self.assertEqual(async_data['previous'], 'http://testserver/async/products/')
+
+    def test_product_detail_matches_sync_view(self):
+        pk = self.products[3].pk
+        sync_data, async_data = self.assertSamePayload(
+            reverse('product-detail', args=[pk]), reverse('async-product-detail', args=[pk]),
+        )
+        self.assertEqual(async_data, sync_data)
+
+        sync_data, async_data = self.assertSamePayload(
+            reverse('product-detail', args=[0]), reverse('async-product-detail', args=[0]),
+            expected_status=status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(async_data, sync_data)
+
+    def test_inventory_lookup_matches_sync_view(self):
+        for product_id in (self.products[0].pk, self.products[1].pk, 0):
+            query = f'?product_id={product_id}'
+            expected = status.HTTP_200_OK if product_id == self.products[0].pk else status.HTTP_404_NOT_FOUND
+            sync_data, async_data = self.assertSamePayload(
+                reverse('inventory-update') + query, reverse('async-inventory') + query, expected,
+            )
+            self.assertEqual(async_data, sync_data)
+
+    def test_sync_hit_keeps_validators_for_async_payload(self):
+        cache.clear()
+        pk = self.products[3].pk
+        self.client.get(reverse('async-product-detail', args=[pk]))
+
+        self.client.get(reverse('product-detail', args=[pk]))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product-detail', args=[pk]))
+        self.assertIn('ETag', response)
+
+    def test_invalid_page_is_not_found(self):
+        response = self.client.get(reverse('async-product-list') + '?page=9')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    async def test_async_stack_is_instrumented(self):
+        await cache.aclear()
+        response = await self.async_client.get(reverse('async-product-detail', args=[self.products[0].pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'desc="1 queries"')
+
+
+class ProjectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        other = Supplier.objects.create(name="Globex", contact_info="")
+        for i in range(4):
+            product = Product.objects.create(
+                name=f"Widget {i}", description="\u2028 line", price=Decimal("5.50"),
+                supplier=supplier if i % 2 else other, reorder_point=2 if i else None,
+            )
+            Inventory.objects.create(product=product, quantity=i)
+
+    def assertProjectionMatches(self, projection, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = FastJSONRenderer().render(projection.serialize(projection.queryset(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_projections_render_the_serializer_output(self):
+        self.assertProjectionMatches(SUPPLIER_PROJECTION, SupplierSerializer, Supplier.objects.order_by('id'))
+        self.assertProjectionMatches(
+            PRODUCT_PROJECTION, ProductSerializer, Product.objects.select_related('supplier').order_by('id'),
+        )
+        self.assertProjectionMatches(
+            INVENTORY_PROJECTION, InventorySerializer,
+            Inventory.objects.select_related('product__supplier').order_by('id'),
+        )
+
+    def test_projection_fetches_nested_rows_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = INVENTORY_PROJECTION.serialize(INVENTORY_PROJECTION.queryset(Inventory.objects.all()))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(rows[0]['product']['supplier']['name'], "Globex")
+
+    def test_list_endpoints_keep_their_payloads(self):
+        response = self.client.get(reverse('product-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = ProductSerializer(Product.objects.select_related('supplier').order_by('id'), many=True).data
+        self.assertEqual(response.json()['results'], json.loads(JSONRenderer().render(expected)))
+
+        response = self.client.get(reverse('inventory-update') + '?cursor=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 4)
+
+    def test_fast_renderer_escapes_like_drf(self):
+        data = {'text': 'a\u2028b\u2029c', 'price': Decimal('1.10'), 'nested': [None, True]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_benchmark_reports_identical_output(self):
+        report = benchmark_serialization(page_size=4, repeat=2)
+        self.assertEqual(set(report), {'product', 'inventory'})
+        self.assertTrue(all(result['identical'] for result in report.values()))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        self.products = [
+            Product.objects.create(name=f"Widget {i}", price=Decimal("5.00"), supplier=self.supplier)
+            for i in range(3)
+        ]
+        for product in self.products:
+            Inventory.objects.create(product=product, quantity=4)
+
+    def test_fields_shrink_the_payload_and_the_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('inventory-update') + '?fields=id,quantity,product.name')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0], {
+            'id': Inventory.objects.order_by('id')[0].id,
+            'product': {'name': "Widget 0"},
+            'quantity': 4,
+        })
+        sql = queries[-1]['sql']
+        self.assertNotIn('"products_supplier"', sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_unexpanded_nested_objects_are_returned_as_ids(self):
+        response = self.client.get(reverse('product-list-create') + '?fields=id,supplier')
+        self.assertEqual(response.data['results'][0], {'id': self.products[0].id, 'supplier': self.supplier.id})
+
+        response = self.client.get(reverse('product-list-create') + '?fields=id&expand=supplier')
+        self.assertEqual(response.data['results'][0]['supplier']['contact_info'], "acme@supplier.com")
+
+        response = self.client.get(reverse('inventory-update') + '?expand=product')
+        self.assertEqual(response.data['results'][0]['product']['supplier'], self.supplier.id)
+
+    def test_sparse_cursor_pages_keep_their_next_link(self):
+        response = self.client.get(reverse('inventory-update') + '?cursor=&page_size=2&fields=quantity')
+        self.assertEqual(response.data['results'], [{'quantity': 4}, {'quantity': 4}])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_unknown_fields_are_rejected(self):
+        for query in ('?fields=secret', '?expand=name', '?fields=supplier.secret'):
+            response = self.client.get(reverse('product-list-create') + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.data)
+
+        response = self.client.get(reverse('async-product-list') + '?fields=secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'error': "Unknown field 'secret'"})
+
+    def test_supplier_list_accepts_fields(self):
+        response = self.client.get(reverse('supplier-list-create') + '?fields=name')
+        self.assertEqual(response.data, [{'name': "Acme"}])
+
+
+@override_settings(CHANGE_FEED_SAFETY_WINDOW=0)
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        self.products = [
+            Product.objects.create(name=f"Widget {i}", price=Decimal("5.00"), supplier=self.supplier)
+            for i in range(3)
+        ]
+        self.inventory = [Inventory.objects.create(product=product, quantity=5) for product in self.products]
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(reverse('inventory-changes'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_returns_only_changes_since_the_watermark(self):
+        data = self.sync()
+        self.assertEqual([row['id'] for row in data['changes']], [item.id for item in self.inventory])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+        data = self.sync(data['watermark'])
+        self.assertEqual(data['changes'], [])
+
+        self.inventory[1].quantity = 9
+        self.inventory[1].save()
+        data = self.sync(data['watermark'], fields='id,quantity')
+        self.assertEqual(data['changes'], [{'id': self.inventory[1].id, 'quantity': 9}])
+
+    def test_supplier_rename_resends_embedding_rows(self):
+        watermark = self.sync()['watermark']
+        self.supplier.name = 'Acme Corp'
+        self.supplier.save()
+
+        data = self.sync(watermark, fields='id', expand='product.supplier')
+        self.assertEqual([row['id'] for row in data['changes']], [item.id for item in self.inventory])
+        self.assertEqual({row['product']['supplier']['name'] for row in data['changes']}, {'Acme Corp'})
+
+        # The embedding rows themselves are not rewritten.
+        self.assertEqual(
+            list(Inventory.objects.order_by('id').values_list('updated_at', flat=True)),
+            [item.updated_at for item in self.inventory]
+        )
+
+    def test_deletes_are_returned_as_tombstones(self):
+        watermark = self.sync()['watermark']
+        deleted_id, product_id = self.inventory[0].id, self.products[0].id
+        self.products[0].delete()
+
+        data = self.sync(watermark)
+        self.assertEqual(data['deleted'], [deleted_id])
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(Tombstone.objects.filter(resource='product', object_id=product_id).count(), 1)
+
+        self.assertEqual(self.sync(data['watermark'])['deleted'], [])
+
+    def test_initial_sync_skips_earlier_deletes(self):
+        self.inventory[2].delete()
+        data = self.sync()
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual(len(data['changes']), 2)
+
+    def test_feed_is_paged(self):
+        data = self.sync(page_size=2)
+        self.assertEqual(len(data['changes']), 2)
+        self.assertTrue(data['has_more'])
+
+        data = self.sync(data['watermark'], page_size=2)
+        self.assertEqual([row['id'] for row in data['changes']], [self.inventory[2].id])
+        self.assertFalse(data['has_more'])
+
+    @override_settings(CHANGE_FEED_SAFETY_WINDOW=60)
+    def test_changes_inside_the_safety_window_wait(self):
+        self.assertEqual(self.sync()['changes'], [])
+
+    def test_changes_wait_for_open_write_transactions(self):
+        watermark = self.sync()['watermark']
+        began = timezone.now()
+        self.inventory[1].quantity = 9
+        self.inventory[1].save()
+
+        with mock.patch('products.visibility.oldest_open_write', return_value=began):
+            self.assertEqual(self.sync(watermark)['changes'], [])
+        self.assertEqual(len(self.sync(watermark)['changes']), 1)
+
+    def test_bad_and_expired_watermarks_are_rejected(self):
+        response = self.client.get(reverse('inventory-changes'), {'since': 'nonsense'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        watermark = self.sync()['watermark']
+        with override_settings(CHANGE_FEED_TOMBSTONE_RETENTION=-1):
+            response = self.client.get(reverse('inventory-changes'), {'since': watermark})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_removes_expired_tombstones(self):
+        self.supplier.delete()
+        self.assertEqual(Tombstone.objects.count(), 7)
+        self.assertEqual(changes.prune_tombstones(), 0)
+        with override_settings(CHANGE_FEED_TOMBSTONE_RETENTION=-1):
+            self.assertEqual(changes.prune_tombstones(), 7)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.supplier = Supplier.objects.create(name="Acme", contact_info="acme@supplier.com")
+        self.product = Product.objects.create(name="Widget", price=Decimal("5.00"), supplier=self.supplier)
+        Inventory.objects.create(product=self.product, quantity=3)
+        self.urls = [
+            reverse('product-detail', kwargs={'pk': self.product.pk}),
+            reverse('supplier-detail', kwargs={'pk': self.supplier.pk}),
+            reverse('inventory-update') + f'?product_id={self.product.pk}',
+            reverse('product-list-create'),
+            reverse('supplier-list-create'),
+            reverse('inventory-update'),
+            reverse('inventory-update') + '?cursor=',
+        ]
+
+    def test_unchanged_resources_are_not_modified(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_not_modified_skips_serialization_on_a_cache_miss(self):
+        url = reverse('product-detail', kwargs={'pk': self.product.pk})
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_embedded_changes_change_the_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.supplier.contact_info = "sales@acme.com"
+        self.supplier.save()
+        for url in self.urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_list_etag_changes_when_rows_are_deleted(self):
+        other = Product.objects.create(name="Gadget", price=Decimal("1.00"), supplier=self.supplier)
+        url = reverse('product-list-create')
+        etag = self.client.get(url)['ETag']
+        other.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_detail_last_modified(self):
+        url = reverse('product-detail', kwargs={'pk': self.product.pk})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertNotIn('Last-Modified', self.client.get(reverse('product-list-create')))
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Supplier.objects.create(name="Acme Tools", contact_info="")
+        self.globex = Supplier.objects.create(name="Globex", contact_info="")
+        self.hammer = Product.objects.create(
+            name="Claw Hammer", description="Steel head", price=Decimal("9.00"), supplier=self.globex
+        )
+        self.mallet = Product.objects.create(
+            name="Rubber Mallet", description="Softer than a hammer", price=Decimal("7.00"), supplier=self.acme
+        )
+        self.saw = Product.objects.create(
+            name="Hand Saw", description="Cuts wood", price=Decimal("12.00"), supplier=self.acme
+        )
+
+    def search(self, text, **params):
+        response = self.client.get(reverse('product-search'), {'q': text, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('hammer'), [self.hammer.id, self.mallet.id])
+
+    def test_terms_match_as_prefixes_across_fields(self):
+        self.assertEqual(self.search('ham'), [self.hammer.id, self.mallet.id])
+        self.assertEqual(sorted(self.search('acme')), [self.mallet.id, self.saw.id])
+        self.assertEqual(self.search('acme wood'), [self.saw.id])
+
+    def test_index_follows_writes(self):
+        self.saw.name = "Hacksaw"
+        self.saw.save()
+        self.assertEqual(self.search('hack'), [self.saw.id])
+
+        self.globex.name = "Initech"
+        self.globex.save()
+        self.assertEqual(self.search('initech'), [self.hammer.id])
+        self.assertEqual(self.search('globex'), [])
+
+        hammer_id = self.hammer.id
+        self.hammer.delete()
+        self.assertNotIn(hammer_id, self.search('hammer'))
+
+    def test_index_triggers_survive_migrations(self):
+        # Migration 0010's triggers keep the index in step with the tables.
+        # A later migration that rebuilds products_product or
+        # products_supplier on SQLite drops them and fails this test.
+        drill = Product.objects.create(name="Power Drill", description="", price=Decimal("40.00"), supplier=self.acme)
+        [router] = Product.objects.bulk_create([
+            Product(name="Wood Router", description="", price=Decimal("80.00"), supplier=self.acme)
+        ])
+        self.assertEqual(search_products('drill')[:], [drill.id])
+        self.assertEqual(search_products('router')[:], [router.id])
+
+        self.acme.name = "Umbrella"
+        self.acme.save()
+        self.assertEqual(
+            sorted(search_products('umbrella')[:]), sorted([self.mallet.id, self.saw.id, drill.id, router.id])
+        )
+
+    def test_results_are_paginated_and_sparse(self):
+        response = self.client.get(reverse('product-search'), {'q': 'a', 'page_size': 1, 'fields': 'name'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(set(response.data['results'][0]), {'name'})
+        self.assertEqual(search_products('hammer')[1:2], [self.mallet.id])
+
+    def test_query_is_required(self):
+        for text in ('', '  '):
+            response = self.client.get(reverse('product-search'), {'q': text})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('"*()'), [])
+
+
+class ListFilterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Supplier.objects.create(name="Acme", contact_info="")
+        self.globex = Supplier.objects.create(name="Globex", contact_info="")
+        self.hammer = Product.objects.create(name="Hammer", description="", price=Decimal("9.00"), supplier=self.acme)
+        self.saw = Product.objects.create(name="Saw", description="", price=Decimal("12.00"), supplier=self.acme)
+        self.drill = Product.objects.create(name="Drill", description="", price=Decimal("45.00"), supplier=self.globex)
+        Inventory.objects.create(product=self.hammer, quantity=3)
+        Inventory.objects.create(product=self.saw, quantity=20)
+        Inventory.objects.create(product=self.drill, quantity=8)
+
+    def results(self, url, async_url, params):
+        # The async views must serve the same rows as the sync ones.
+        response = self.client.get(reverse(url), params)
+        async_response = self.client.get(reverse(async_url), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json()['results'], response.json()['results'])
+        return response.data['results']
+
+    def product_ids(self, **params):
+        return [row['id'] for row in self.results('product-list-create', 'async-product-list', params)]
+
+    def inventory_product_ids(self, **params):
+        return [row['product']['id'] for row in self.results('inventory-update', 'async-inventory', params)]
+
+    def test_product_filters(self):
+        self.assertEqual(self.product_ids(supplier_id=self.acme.id), [self.hammer.id, self.saw.id])
+        self.assertEqual(self.product_ids(min_price='10', max_price='45'), [self.saw.id, self.drill.id])
+        self.assertEqual(self.product_ids(supplier_id=self.acme.id, min_price='10'), [self.saw.id])
+
+        Product.objects.filter(pk=self.drill.pk).update(updated_at='2020-01-01T00:00:00Z')
+        self.assertEqual(self.product_ids(updated_before='2021-01-01T00:00:00Z'), [self.drill.id])
+        self.assertEqual(self.product_ids(updated_after='2021-01-01T00:00:00'), [self.hammer.id, self.saw.id])
+
+    def test_inventory_filters(self):
+        self.assertEqual(self.inventory_product_ids(supplier_id=self.acme.id), [self.hammer.id, self.saw.id])
+        self.assertEqual(self.inventory_product_ids(min_quantity=5, max_quantity=20), [self.saw.id, self.drill.id])
+        self.assertEqual(self.inventory_product_ids(supplier_id=self.globex.id, cursor=''), [self.drill.id])
+
+    def test_ordering_is_allow_listed_and_stable(self):
+        self.assertEqual(self.product_ids(ordering='-price'), [self.drill.id, self.saw.id, self.hammer.id])
+        self.assertEqual(self.product_ids(ordering='name'), [self.drill.id, self.hammer.id, self.saw.id])
+        self.assertEqual(self.inventory_product_ids(ordering='-quantity'), [self.saw.id, self.drill.id, self.hammer.id])
+        # Fields outside ordering_fields fall back to the default order.
+        self.assertEqual(self.product_ids(ordering='description'), [self.hammer.id, self.saw.id, self.drill.id])
+
+        Product.objects.update(price=Decimal("5.00"))
+        cache.clear()
+        self.assertEqual(self.product_ids(ordering='-price'), [self.drill.id, self.saw.id, self.hammer.id])
+        self.assertEqual(self.product_ids(ordering='price', page_size=2), [self.hammer.id, self.saw.id])
+        self.assertEqual(self.product_ids(ordering='price', page_size=2, page=2), [self.drill.id])
+
+    def test_invalid_values_are_rejected(self):
+        for url, params in (
+            (reverse('product-list-create'), {'min_price': 'cheap'}),
+            (reverse('product-list-create'), {'updated_after': 'yesterday'}),
+            (reverse('inventory-update'), {'supplier_id': 'acme'}),
+            (reverse('inventory-update'), {'max_quantity': '1.5'}),
+            (reverse('async-product-list'), {'min_price': 'cheap'}),
+            (reverse('async-inventory'), {'max_quantity': '1.5'}),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.json()['error'])
+
+    def test_filtered_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plans are checked on SQLite')
+        # (url, params, whether the order must come from an index rather
+        # than a sort; ranges ordered by id sort only their matches).
+        requests = [
+            (reverse('product-list-create'), {'supplier_id': self.acme.id}, True),
+            (reverse('product-list-create'), {'min_price': '10', 'max_price': '20'}, False),
+            (reverse('product-list-create'), {
+                'updated_after': '2020-01-01T00:00:00Z', 'updated_before': '2021-01-01T00:00:00Z'
+            }, False),
+            (reverse('product-list-create'), {'ordering': '-price'}, True),
+            (reverse('product-list-create'), {'ordering': 'name'}, True),
+            (reverse('inventory-update'), {'min_quantity': 5, 'max_quantity': 10}, False),
+            (reverse('inventory-update'), {'ordering': '-quantity'}, True),
+            (reverse('inventory-update'), {'supplier_id': self.acme.id}, False),
+        ]
+        for url, params, indexed_order in requests:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, params)
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plan = [row[-1] for row in cursor.fetchall()]
+                for step in plan:
+                    if step.startswith('SCAN') and 'USING' not in step:
+                        self.fail(f'{params}: full table scan ({step}) in {query["sql"]}')
+                    if indexed_order:
+                        self.assertNotIn('TEMP B-TREE', step, f'{params}: sort in {query["sql"]}')
+
+
+class StockLedgerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.supplier = Supplier.objects.create(name="Acme", contact_info="")
+        self.product = Product.objects.create(name="Hammer", description="", price=Decimal("9.00"), supplier=self.supplier)
+        self.now = timezone.now()
+
+    def move(self, delta, days_ago):
+        movement = StockMovement.objects.create(product=self.product, delta=delta)
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=self.now - timedelta(days=days_ago))
+
+    def days_ago(self, days):
+        return self.now - timedelta(days=days)
+
+    def test_every_write_path_appends_movements(self):
+        self.client.post(reverse('inventory-update'), {'product_id': self.product.id, 'quantity': 10}, format='json')
+        self.client.post(reverse('inventory-update'), {'product_id': self.product.id, 'quantity': 4}, format='json')
+        self.client.post(reverse('inventory-update'), {'product_id': self.product.id, 'quantity': 4}, format='json')
+        self.client.post(reverse('inventory-bulk-adjust'), [
+            {'product_id': self.product.id, 'delta': 6},
+        ], format='json')
+        CsvImporter().run(enumerate([{
+            'supplier_name': 'Acme', 'product_name': 'Hammer', 'description': '', 'price': '9.00', 'quantity': '7',
+        }], start=1))
+
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('delta', flat=True)), [10, -6, 6, -3]
+        )
+        self.assertEqual(ledger.stock_at(self.product.id, timezone.now())['quantity'], 7)
+
+    def test_snapshots_do_not_change_answers(self):
+        self.move(20, 5)
+        self.move(-5, 4)
+        self.move(10, 3)
+        self.move(-8, 1)
+
+        def answers():
+            return (
+                ledger.stock_at(self.product.id, self.days_ago(3.5)),
+                ledger.stock_at(self.product.id, self.days_ago(0.5)),
+                ledger.movement_between(self.product.id, self.days_ago(4.5), self.days_ago(0.5)),
+            )
+
+        expected = (
+            {'quantity': 15, 'received': 20, 'issued': 5},
+            {'quantity': 17, 'received': 30, 'issued': 13},
+            {'opening': 20, 'closing': 17, 'received': 10, 'issued': 13, 'net': -3},
+        )
+        self.assertEqual(answers(), expected)
+
+        self.assertEqual(ledger.take_snapshots(now=self.days_ago(3.8)), 1)
+        self.assertEqual(ledger.take_snapshots(now=self.days_ago(3.8)), 0)
+        self.assertEqual(ledger.take_snapshots(now=self.days_ago(2)), 1)
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by('taken_at').values_list('quantity', 'received', 'issued')),
+            [(15, 20, 5), (25, 30, 5)]
+        )
+        self.assertEqual(answers(), expected)
+        # One snapshot lookup and one aggregate over the movements since.
+        with self.assertNumQueries(2):
+            ledger.stock_at(self.product.id, self.now)
+
+    @override_settings(STOCK_LEDGER_RETENTION=int(timedelta(days=2.5).total_seconds()))
+    def test_compaction_keeps_history_since_the_horizon(self):
+        self.move(20, 5)
+        self.move(-5, 4)
+        self.move(10, 3)
+        self.move(-8, 1)
+        ledger.take_snapshots(now=self.days_ago(4.5))
+        ledger.take_snapshots(now=self.days_ago(3.8))
+        ledger.take_snapshots(now=self.days_ago(2))
+
+        self.assertEqual(ledger.compact(), (2, 1))
+        self.assertEqual(StockMovement.objects.count(), 2)
+        self.assertEqual(ledger.stock_at(self.product.id, self.days_ago(2.4))['quantity'], 25)
+        self.assertEqual(
+            ledger.movement_between(self.product.id, self.days_ago(2.4), self.now),
+            {'opening': 25, 'closing': 17, 'received': 0, 'issued': 8, 'net': -8}
+        )
+        with self.assertRaises(ValueError):
+            ledger.stock_at(self.product.id, self.days_ago(3))
+        self.assertEqual(ledger.compact(), (0, 0))
+
+    def test_no_history_before_opening_balance(self):
+        StockSnapshot.objects.create(product=self.product, taken_at=self.days_ago(3), quantity=20)
+        self.move(-5, 2)
+
+        self.assertEqual(ledger.stock_at(self.product.id, self.days_ago(1))['quantity'], 15)
+        with self.assertRaises(ValueError):
+            ledger.stock_at(self.product.id, self.days_ago(4))
+        response = self.client.get(reverse('inventory-history'), {
+            'product_id': self.product.id, 'at': self.days_ago(4).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_history_endpoints(self):
+        self.move(20, 3)
+        self.move(-5, 1)
+        response = self.client.get(reverse('inventory-history'), {
+            'product_id': self.product.id, 'at': self.days_ago(2).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantity'], 20)
+
+        response = self.client.get(reverse('inventory-movements'), {
+            'product_id': self.product.id, 'start': self.days_ago(2).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['opening'], response.data['closing'], response.data['issued']), (20, 15, 5))
+
+        for url, params, code in (
+            (reverse('inventory-history'), {}, status.HTTP_400_BAD_REQUEST),
+            (reverse('inventory-history'), {'product_id': self.product.id, 'at': 'noon'}, status.HTTP_400_BAD_REQUEST),
+            (reverse('inventory-history'), {'product_id': 0}, status.HTTP_404_NOT_FOUND),
+            (reverse('inventory-movements'), {'product_id': self.product.id}, status.HTTP_400_BAD_REQUEST),
+            (reverse('inventory-movements'), {
+                'product_id': self.product.id, 'start': self.now.isoformat(), 'end': self.days_ago(1).isoformat(),
+            }, status.HTTP_400_BAD_REQUEST),
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, code, params)
+            self.assertIn('error', response.data)
+
+
+class SupplierSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Supplier.objects.create(name="Acme", contact_info="", default_reorder_point=5)
+        self.globex = Supplier.objects.create(name="Globex", contact_info="")
+        self.hammer = Product.objects.create(name="Hammer", description="", price=Decimal("9.50"), supplier=self.acme)
+        self.saw = Product.objects.create(name="Saw", description="", price=Decimal("12.00"), supplier=self.acme)
+        Product.objects.create(name="Drill", description="", price=Decimal("45.00"), supplier=self.globex)
+        Inventory.objects.create(product=self.hammer, quantity=2)
+        Inventory.objects.create(product=self.saw, quantity=10)
+
+    def summary(self, supplier):
+        response = self.client.get(reverse('supplier-summary-detail', args=[supplier.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_refresh_computes_aggregates(self):
+        self.assertEqual(summaries.refresh_summaries(), 2)
+        acme = self.summary(self.acme)
+        self.assertEqual(
+            (acme['product_count'], acme['units'], acme['stock_value'], acme['below_reorder_point'], acme['stale']),
+            (2, 12, '139.00', 1, False)
+        )
+        globex = self.summary(self.globex)
+        self.assertEqual((globex['product_count'], globex['units'], globex['stock_value']), (1, 0, '0.00'))
+        self.assertEqual(summaries.refresh_summaries(), 0)
+
+    def test_writes_mark_only_affected_suppliers_stale(self):
+        summaries.refresh_summaries()
+
+        def stale():
+            return set(SupplierStockSummary.objects.filter(stale=True).values_list('supplier_id', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('inventory-update'), {'product_id': self.hammer.id, 'quantity': 7}, format='json')
+        self.assertEqual(stale(), {self.acme.id})
+        self.assertEqual(summaries.refresh_summaries(), 1)
+        self.assertEqual(self.summary(self.acme)['below_reorder_point'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('inventory-bulk-adjust'), [{'product_id': self.saw.id, 'delta': -8}], format='json')
+        self.assertEqual(stale(), {self.acme.id})
+        summaries.refresh_summaries()
+
+        saw = Product.objects.get(pk=self.saw.pk)
+        saw.supplier = self.globex
+        with self.captureOnCommitCallbacks(execute=True):
+            saw.save()
+        self.assertEqual(stale(), {self.acme.id, self.globex.id})
+        summaries.refresh_summaries()
+        self.assertEqual(self.summary(self.acme)['product_count'], 1)
+        self.assertEqual(self.summary(self.globex)['units'], 2)
+
+        # A write committing while a refresh is reading marks its supplier
+        # stale again once committed.
+        compute = summaries._compute
+
+        def compute_during_write(supplier_ids):
+            rows = compute(supplier_ids)
+            Inventory.objects.filter(product=self.hammer).update(quantity=1)
+            summaries.mark_stale(product_ids=[self.hammer.id])
+            return rows
+
+        with mock.patch.object(summaries, '_compute', side_effect=compute_during_write):
+            summaries.refresh_summaries(full=True)
+        self.assertEqual(stale(), {self.acme.id})
+        summaries.refresh_summaries()
+        self.assertEqual(self.summary(self.acme)['units'], 1)
+
+    def test_report_endpoints(self):
+        summaries.refresh_summaries()
+        response = self.client.get(reverse('supplier-summary-list'), {'ordering': '-stock_value'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['supplier_name'] for row in response.data['results']], ['Acme', 'Globex'])
+
+        response = self.client.get(reverse('stock-report'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['suppliers'], 2)
+        self.assertEqual(response.data['product_count'], 3)
+        self.assertEqual(response.data['units'], 12)
+        self.assertEqual(response.data['stock_value'], '139.00')
+        self.assertEqual(response.data['below_reorder_point'], 1)
+        self.assertEqual(response.data['stale_suppliers'], 0)
+
+        response = self.client.get(reverse('supplier-summary-detail', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, {'error': 'Supplier summary not found'})
+
+        # Reports read the summary table alone, whatever the catalogue size.
+        with self.assertNumQueries(1):
+            self.client.get(reverse('stock-report'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('supplier-summary-detail', args=[self.acme.id]))
+
+
+class BulkUpsertTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Supplier.objects.create(name="Acme", contact_info="old")
+        self.globex = Supplier.objects.create(name="Globex", contact_info="")
+        self.hammer = Product.objects.create(name="Hammer", description="", price=Decimal("9.00"), supplier=self.acme)
+        self.url = reverse('product-list-create')
+
+    def products(self, count, **fields):
+        return [
+            {'name': f'Product {i}', 'description': 'Tool', 'price': '1.00', 'supplier_id': self.globex.id, **fields}
+            for i in range(count)
+        ]
+
+    def test_products_are_created_and_updated_by_natural_key(self):
+        response = self.client.post(self.url, [
+            {'name': 'Hammer', 'description': 'Steel', 'price': '11.00', 'supplier_id': self.acme.id},
+            {'name': 'Hammer', 'description': 'Rubber', 'price': '7.00', 'supplier_id': self.globex.id},
+            {'name': 'Saw', 'description': 'Tool', 'price': '5.00', 'supplier_id': self.acme.id},
+            {'name': 'Saw', 'description': 'Hand saw', 'price': '6.00', 'supplier_id': self.acme.id},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['name'], row['supplier']['name'], row['price']) for row in response.data],
+            [('Hammer', 'Acme', '11.00'), ('Hammer', 'Globex', '7.00'), ('Saw', 'Acme', '6.00')]
+        )
+
+        self.hammer.refresh_from_db()
+        self.assertEqual((self.hammer.description, self.hammer.price), ('Steel', Decimal('11.00')))
+        self.assertEqual(response.data[0]['id'], self.hammer.id)
+        self.assertEqual(response.data[0]['created_at'], ProductSerializer(self.hammer).data['created_at'])
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_related_keys_are_checked_in_one_query(self):
+        with CaptureQueriesContext(connection) as single:
+            self.client.post(self.url, self.products(1), format='json')
+        with self.assertNumQueries(len(single)):
+            response = self.client.post(self.url, self.products(50), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Product.objects.filter(supplier=self.globex).count(), 50)
+
+    def test_invalid_items_are_reported_per_item(self):
+        response = self.client.post(self.url, [
+            {'name': 'Saw', 'description': 'Tool', 'price': '5.00', 'supplier_id': self.acme.id},
+            {'name': 'Drill', 'description': 'Tool', 'price': '5.00', 'supplier_id': 0},
+            {'name': 'Level', 'description': 'Tool', 'price': 'cheap', 'supplier_id': True},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('supplier_id', response.data[1])
+        self.assertEqual(set(response.data[2]), {'price', 'supplier_id'})
+        self.assertEqual(Product.objects.count(), 1)
+
+        self.assertEqual(self.client.post(self.url, [], format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(CATALOG_BULK_MAX_ITEMS=2):
+            response = self.client.post(self.url, self.products(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+    def test_suppliers_are_upserted_by_name_and_caches_refreshed(self):
+        url = reverse('supplier-list-create')
+        self.client.get(url)
+        self.client.get(reverse('product-detail', args=[self.hammer.id]))
+        summaries.refresh_summaries()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, [
+                {'name': 'Acme', 'contact_info': 'new', 'default_reorder_point': 3},
+                {'name': 'Initech', 'contact_info': 'sales@initech.test'},
+            ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data][0], self.acme.id)
+
+        listed = {row['name']: row for row in self.client.get(url).data}
+        self.assertEqual(listed['Acme']['contact_info'], 'new')
+        self.assertIn('Initech', listed)
+        detail = self.client.get(reverse('product-detail', args=[self.hammer.id])).data
+        self.assertEqual(detail['supplier']['contact_info'], 'new')
+        self.assertTrue(SupplierStockSummary.objects.get(supplier=self.acme).stale)
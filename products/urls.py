@@ -2,12 +2,25 @@ from django.urls import path
 from .views import (
     ProductListCreateAPIView,
     ProductDetailAPIView,
+    ProductSearchView,
     SupplierListCreateAPIView,
     SupplierDetailAPIView,
     InventoryView,
+    InventoryBulkAdjustView,
+    ReorderListAPIView,
+    ChangeFeedView,
+    StockLevelView,
+    StockMovementView,
     FileUploadView,
+    ImportJobDetailAPIView,
+    SupplierSummaryListView,
+    SupplierSummaryDetailView,
+    StockReportView,
+    CacheStatsView,
+    MetricsView,
 )
 from rest_framework import permissions
+from . import async_views
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
@@ -29,15 +42,37 @@ urlpatterns = [
     # Products
     path('products/', ProductListCreateAPIView.as_view(), name='product-list-create'),
     path('products/<int:pk>/', ProductDetailAPIView.as_view(), name='product-detail'),
+    path('products/search/', ProductSearchView.as_view(), name='product-search'),
+    path('products/changes/', ChangeFeedView.as_view(resource='product'), name='product-changes'),
 
     # Suppliers
     path('suppliers/', SupplierListCreateAPIView.as_view(), name='supplier-list-create'),
     path('suppliers/<int:pk>/', SupplierDetailAPIView.as_view(), name='supplier-detail'),
+    path('suppliers/changes/', ChangeFeedView.as_view(resource='supplier'), name='supplier-changes'),
 
     # Inventory
     path('inventory/', InventoryView.as_view(), name='inventory-update'),
+    path('inventory/bulk/', InventoryBulkAdjustView.as_view(), name='inventory-bulk-adjust'),
+    path('inventory/reorder/', ReorderListAPIView.as_view(), name='inventory-reorder'),
+    path('inventory/changes/', ChangeFeedView.as_view(resource='inventory'), name='inventory-changes'),
+    path('inventory/history/', StockLevelView.as_view(), name='inventory-history'),
+    path('inventory/movements/', StockMovementView.as_view(), name='inventory-movements'),
+    # Async reads for ASGI deployments; same payloads and cache entries as the
+    # views above, which remain the sync path for WSGI and for writes.
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('async/inventory/', async_views.inventory, name='async-inventory'),
+    # Reports
+    path('reports/suppliers/', SupplierSummaryListView.as_view(), name='supplier-summary-list'),
+    path('reports/suppliers/<int:supplier_id>/', SupplierSummaryDetailView.as_view(), name='supplier-summary-detail'),
+    path('reports/stock/', StockReportView.as_view(), name='stock-report'),
     # Csv file upload
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('upload/<str:task_id>/', ImportJobDetailAPIView.as_view(), name='import-job-detail'),
+    # Cache
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    # Metrics
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     #swagger
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0)),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0)),
@@ -1,25 +1,251 @@
+import os
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse
+from django.urls import get_resolver
+from django.utils import timezone
+from django_celery_results.models import TaskResult
 from rest_framework import generics, status, viewsets
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import APIException, ParseError
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Product, Supplier, Inventory
-from .serializers import ProductSerializer, SupplierSerializer, InventorySerializer
-from .tasks import process_csv_file
+from .models import Product, Supplier, Inventory, ImportJob, SupplierStockSummary
+from .serializers import (
+    ProductSerializer,
+    SupplierSerializer,
+    InventorySerializer,
+    ImportJobSerializer,
+    ReorderItemSerializer,
+    ProductUpsertSerializer,
+    SupplierUpsertSerializer,
+    SupplierStockSummarySerializer,
+)
+from . import cache as api_cache
+from . import changes
+from . import conditional
+from . import ledger
+from . import metrics
+from . import search
+from .filters import (
+    INVENTORY_FILTERS,
+    PRODUCT_FILTERS,
+    QueryParamFilter,
+    REORDER_FILTERS,
+    StableOrderingFilter,
+    apply_filters,
+    parse_integer,
+    parse_timestamp,
+)
+from .importer import spool_upload
+from .middleware import UNMATCHED_VIEW, serialization_timer
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .projections import (
+    EXPAND_QUERY_PARAM,
+    FIELDS_QUERY_PARAM,
+    INVENTORY_PROJECTION,
+    PRODUCT_PROJECTION,
+    REORDER_ITEM_PROJECTION,
+    SUPPLIER_PROJECTION,
+)
+from .stock import apply_stock_adjustments
+from .tasks import import_csv_file
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+FIELDS_PARAMETER = openapi.Parameter(
+    FIELDS_QUERY_PARAM,
+    openapi.IN_QUERY,
+    description="Comma separated fields to return, e.g. 'id,name' or 'id,quantity,product.name'. "
+                "Nested objects not selected or expanded are returned as their id",
+    type=openapi.TYPE_STRING
+)
+EXPAND_PARAMETER = openapi.Parameter(
+    EXPAND_QUERY_PARAM,
+    openapi.IN_QUERY,
+    description="Comma separated nested objects to return in full, e.g. 'supplier' or 'product.supplier'",
+    type=openapi.TYPE_STRING
+)
 
+UPDATED_AFTER_PARAMETER = openapi.Parameter(
+    'updated_after',
+    openapi.IN_QUERY,
+    description="Only rows updated at or after this ISO 8601 time",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+UPDATED_BEFORE_PARAMETER = openapi.Parameter(
+    'updated_before',
+    openapi.IN_QUERY,
+    description="Only rows updated before this ISO 8601 time",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
 
-class ProductListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Product.objects.all().order_by('id')
+
+def ordering_parameter(fields):
+    return openapi.Parameter(
+        'ordering',
+        openapi.IN_QUERY,
+        description=f"Sort by one of {', '.join(fields)}; prefix with '-' for descending",
+        type=openapi.TYPE_STRING
+    )
+
+
+def requested_projection(projection, request, paginator=None):
+    """``projection`` narrowed to the request's ``fields`` and ``expand`` parameters."""
+    try:
+        return projection.for_request(request, keep=getattr(paginator, 'position_fields', ()))
+    except ValueError as e:
+        raise ParseError({'error': str(e)})
+
+
+def cached_response(request, key, validate, build):
+    """
+    Serve a payload from the API cache under ``key`` with ETag (and, for
+    single objects, Last-Modified) validators, answering conditional GETs
+    with 304.
+
+    Cached payloads are stored with their validators, so a hit needs no
+    query either way. On a miss ``validate`` computes the validators from
+    the updated_at columns first; a client whose copy is current gets its
+    304 before ``build`` fetches and serializes anything, and the
+    validators are cached on their own for its next revalidation. ``build`` returns
+    the payload, or a ``Response`` to send as is, such as an error.
+    """
+    entry = api_cache.get_entry(key)
+    data, validators = entry if entry is not None else (None, None)
+    if validators is None:
+        validators = validate()
+        if data is not None:
+            # Cached without validators (by the async views): store them
+            # so later hits need no query.
+            api_cache.set_payload(key, data, validators)
+
+    response = conditional.not_modified(request, validators)
+    if response is not None:
+        if entry is None:
+            # Keep the validators so the next revalidation needs no query.
+            api_cache.set_payload(key, None, validators)
+        return response
+
+    if data is None:
+        data = build()
+        if isinstance(data, Response):
+            return data
+        api_cache.set_payload(key, data, validators)
+    response = Response(data, status=status.HTTP_200_OK)
+    conditional.set_validators(response, request, validators)
+    return response
+
+
+class CachedRetrieveMixin:
+    """
+    Serve ``retrieve`` from the API cache, keyed by ``cache_resource`` and pk,
+    with conditional GET support.
+    """
+    cache_resource = None
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+
+        def build():
+            instance = self.get_object()
+            with serialization_timer(request):
+                return self.get_serializer(instance).data
+
+        return cached_response(
+            request,
+            api_cache.detail_key(self.cache_resource, pk),
+            lambda: conditional.detail_validators(self.get_queryset().filter(pk=pk), self.cache_resource),
+            build,
+        )
+
+
+class CachedListMixin:
+    """
+    Serve ``list`` from the API cache, keyed by ``cache_resource`` and the
+    full query string, so each page is cached separately, with conditional
+    GET support.
+    """
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        def validate():
+            paginator = self.pagination_class() if self.pagination_class is not None else None
+            return conditional.list_validators(
+                request, self.filter_queryset(self.get_queryset()), self.cache_resource, paginator
+            )
+
+        return cached_response(
+            request,
+            api_cache.list_key(self.cache_resource, request),
+            validate,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+        )
+
+
+class ProjectedListMixin:
+    """
+    Serve ``list`` through ``projection``, a ``values()`` fast path that
+    renders the same payload as ``serializer_class``, narrowed to the
+    request's sparse fieldset.
+    """
+    projection = None
+
+    def list(self, request, *args, **kwargs):
+        projection = requested_projection(self.projection, request, self.paginator)
+        queryset = projection.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        with serialization_timer(request):
+            data = projection.serialize(rows)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class BulkUpsertMixin:
+    """
+    Let ``create`` also take a list of objects, upserted on their natural
+    key by ``bulk_serializer_class`` (see ``BulkUpsertListSerializer``).
+    """
+    bulk_serializer_class = None
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        if len(request.data) > settings.CATALOG_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.CATALOG_BULK_MAX_ITEMS} items per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = self.bulk_serializer_class(
+            data=request.data, many=True, allow_empty=False, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        with serialization_timer(request):
+            data = serializer.data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ProductListCreateAPIView(BulkUpsertMixin, CachedListMixin, ProjectedListMixin, generics.ListCreateAPIView):
+    cache_resource = 'product'
+    projection = PRODUCT_PROJECTION
+    queryset = Product.objects.select_related('supplier').order_by('id')
     serializer_class = ProductSerializer
+    bulk_serializer_class = ProductUpsertSerializer
     pagination_class = StandardResultsSetPagination
+    filter_backends = [QueryParamFilter, StableOrderingFilter]
+    query_filters = PRODUCT_FILTERS
+    ordering_fields = ['id', 'name', 'price', 'updated_at']
+    ordering = ['id']
 
     @swagger_auto_schema(
         operation_description="List all products with pagination",
@@ -35,7 +261,30 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
                 openapi.IN_QUERY,
                 description="Number of items per page",
                 type=openapi.TYPE_INTEGER
-            )
+            ),
+            openapi.Parameter(
+                'supplier_id',
+                openapi.IN_QUERY,
+                description="Only list products of this supplier",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'min_price',
+                openapi.IN_QUERY,
+                description="Only list products priced at or above this",
+                type=openapi.TYPE_NUMBER
+            ),
+            openapi.Parameter(
+                'max_price',
+                openapi.IN_QUERY,
+                description="Only list products priced at or below this",
+                type=openapi.TYPE_NUMBER
+            ),
+            UPDATED_AFTER_PARAMETER,
+            UPDATED_BEFORE_PARAMETER,
+            ordering_parameter(ordering_fields),
+            FIELDS_PARAMETER,
+            EXPAND_PARAMETER
         ],
         responses={
             200: ProductSerializer(many=True),
@@ -46,9 +295,12 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
         return super().get(request, *args, **kwargs)
 
     @swagger_auto_schema(
-        operation_description="Create a new product",
+        operation_description="Create a new product. Send a list of products instead to create or update "
+                              "them in bulk: items matching an existing product by supplier_id and name "
+                              "update it, and the saved products are returned with status 200",
         request_body=ProductSerializer,
         responses={
+            200: ProductSerializer(many=True),
             201: ProductSerializer(),
             400: "Bad Request"
         }
@@ -57,8 +309,9 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+class ProductDetailAPIView(CachedRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_resource = 'product'
+    queryset = Product.objects.select_related('supplier')
     serializer_class = ProductSerializer
 
     @swagger_auto_schema(
@@ -84,30 +337,100 @@ class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         return super().put(request, *args, **kwargs)
 
 
-class SupplierListCreateAPIView(generics.ListCreateAPIView):
+class ProductSearchView(APIView):
+    """
+    API endpoint searching products by name, description and supplier name
+    """
+
+    @swagger_auto_schema(
+        operation_description="Search products by name, description and supplier name. Every word matches "
+                              "as a prefix; results are ranked with name matches first",
+        manual_parameters=[
+            openapi.Parameter(
+                'q',
+                openapi.IN_QUERY,
+                description="Search text",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter(
+                'page',
+                openapi.IN_QUERY,
+                description="Page number",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Number of items per page",
+                type=openapi.TYPE_INTEGER
+            ),
+            FIELDS_PARAMETER,
+            EXPAND_PARAMETER
+        ],
+        responses={
+            200: ProductSerializer(many=True),
+            400: "Bad Request"
+        }
+    )
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {'error': 'q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            projection = PRODUCT_PROJECTION.for_request(request, keep=('id',))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Results depend on product and supplier names, both of which
+        # invalidate the product lists.
+        key = api_cache.list_key('product', request)
+        data = api_cache.get_payload(key)
+        if data is None:
+            paginator = StandardResultsSetPagination()
+            ids = paginator.paginate_queryset(search.search_products(text), request, view=self)
+            rows = {row['id']: row for row in projection.queryset(Product.objects.filter(id__in=ids))}
+            with serialization_timer(request):
+                results = projection.serialize([rows[pk] for pk in ids if pk in rows])
+            data = paginator.get_paginated_response(results).data
+            api_cache.set_payload(key, data)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class SupplierListCreateAPIView(BulkUpsertMixin, CachedListMixin, ProjectedListMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating suppliers
     """
+    cache_resource = 'supplier'
+    projection = SUPPLIER_PROJECTION
     queryset = Supplier.objects.all().order_by('id')
     serializer_class = SupplierSerializer
+    bulk_serializer_class = SupplierUpsertSerializer
 
     @swagger_auto_schema(
         operation_description="List all suppliers",
+        manual_parameters=[FIELDS_PARAMETER],
         responses={200: SupplierSerializer(many=True)}
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
     @swagger_auto_schema(
-        operation_description="Create a new supplier",
+        operation_description="Create a new supplier. Send a list of suppliers instead to create or update "
+                              "them in bulk: items matching an existing supplier by name update it, and the "
+                              "saved suppliers are returned with status 200",
         request_body=SupplierSerializer,
-        responses={201: SupplierSerializer()}
+        responses={200: SupplierSerializer(many=True), 201: SupplierSerializer()}
     )
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
 
-class SupplierDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class SupplierDetailAPIView(CachedRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_resource = 'supplier'
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
 
@@ -135,6 +458,9 @@ class SupplierDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class InventoryView(APIView):
+    query_filters = INVENTORY_FILTERS
+    ordering_fields = ['id', 'quantity', 'updated_at']
+    ordering = ['id']
 
     @swagger_auto_schema(
         operation_description="Get inventory details",
@@ -145,7 +471,49 @@ class InventoryView(APIView):
                 description="ID of the product to get inventory for",
                 type=openapi.TYPE_INTEGER,
                 required=False
-            )
+            ),
+            openapi.Parameter(
+                'page',
+                openapi.IN_QUERY,
+                description="Page number",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Number of items per page",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description="Walk the inventory in (updated_at, id) order instead of by page number. "
+                            "Send an empty cursor to start, then follow the 'next' link",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'supplier_id',
+                openapi.IN_QUERY,
+                description="Only list inventory of this supplier's products",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'min_quantity',
+                openapi.IN_QUERY,
+                description="Only list inventory with at least this quantity",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'max_quantity',
+                openapi.IN_QUERY,
+                description="Only list inventory with at most this quantity",
+                type=openapi.TYPE_INTEGER
+            ),
+            UPDATED_AFTER_PARAMETER,
+            UPDATED_BEFORE_PARAMETER,
+            ordering_parameter(ordering_fields),
+            FIELDS_PARAMETER,
+            EXPAND_PARAMETER
         ],
         responses={
             200: InventorySerializer(many=True),
@@ -165,28 +533,71 @@ class InventoryView(APIView):
             product_id = request.query_params.get('product_id')
 
             if product_id:
+                # Cache under the canonical id: signals only invalidate that key.
                 try:
-                    product = Product.objects.get(id=product_id)
-                except Product.DoesNotExist:
+                    product_id = parse_integer(product_id)
+                except ValueError:
                     return Response(
-                        {'error': 'Product not found'},
-                        status=status.HTTP_404_NOT_FOUND
+                        {'error': f'Invalid product_id: {product_id}'},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
 
-                inventory = Inventory.objects.filter(product=product).first()
-                if not inventory:
-                    return Response(
-                        {'error': 'Inventory not found for this product'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
+                def build_item():
+                    inventory = Inventory.objects.select_related('product__supplier').filter(
+                        product_id=product_id
+                    ).first()
+                    if not inventory:
+                        if not Product.objects.filter(id=product_id).exists():
+                            return Response(
+                                {'error': 'Product not found'},
+                                status=status.HTTP_404_NOT_FOUND
+                            )
+                        return Response(
+                            {'error': 'Inventory not found for this product'},
+                            status=status.HTTP_404_NOT_FOUND
+                        )
+                    with serialization_timer(request):
+                        return InventorySerializer(inventory).data
+
+                return cached_response(
+                    request,
+                    api_cache.detail_key('inventory', product_id),
+                    lambda: conditional.detail_validators(
+                        Inventory.objects.filter(product_id=product_id), 'inventory'
+                    ),
+                    build_item,
+                )
+
+            try:
+                inventory = apply_filters(
+                    Inventory.objects.select_related('product__supplier'), request.query_params, self.query_filters
+                )
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if KeysetPagination.cursor_query_param in request.query_params:
+                # Cursors walk in their own (updated_at, id) order.
+                pagination_class = KeysetPagination
+            else:
+                pagination_class = StandardResultsSetPagination
+                inventory = StableOrderingFilter().filter_queryset(request, inventory, self)
 
-                serializer = InventorySerializer(inventory)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+            def build_page():
+                paginator = pagination_class()
+                projection = requested_projection(INVENTORY_PROJECTION, request, paginator)
+                page = paginator.paginate_queryset(projection.queryset(inventory), request, view=self)
+                with serialization_timer(request):
+                    results = projection.serialize(page)
+                return paginator.get_paginated_response(results).data
 
-            inventory = Inventory.objects.all()
-            serializer = InventorySerializer(inventory, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return cached_response(
+                request,
+                api_cache.list_key('inventory', request),
+                lambda: conditional.list_validators(request, inventory, 'inventory', pagination_class()),
+                build_page,
+            )
 
+        except APIException:
+            raise
         except Exception as e:
             return Response(
                 {'error': 'An unexpected error occurred: ' + str(e)},
@@ -221,24 +632,30 @@ class InventoryView(APIView):
                 )
 
             try:
-                product = Product.objects.get(id=product_id)
+                product = Product.objects.select_related('supplier').get(id=product_id)
             except Product.DoesNotExist:
                 return Response(
                     {'error': 'Product not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            inventory, created = Inventory.objects.get_or_create(
-                product=product,
-                defaults={'quantity': quantity}
-            )
+            with transaction.atomic():
+                # Hold the row until commit so the stock ledger records the
+                # change against the quantity this save replaces.
+                inventory, created = Inventory.objects.select_for_update(of=('self',)).select_related(
+                    'product__supplier'
+                ).get_or_create(
+                    product=product,
+                    defaults={'quantity': quantity}
+                )
 
-            if not created:
-                inventory.quantity = quantity
-                inventory.save()
+                if not created:
+                    inventory.quantity = quantity
+                    inventory.save()
 
-            serializer = InventorySerializer(inventory)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            with serialization_timer(request):
+                data = InventorySerializer(inventory).data
+            return Response(data, status=status.HTTP_200_OK)
 
         except ValueError as e:
             return Response(
@@ -252,6 +669,113 @@ class InventoryView(APIView):
             )
 
 
+class ReorderListAPIView(ProjectedListMixin, generics.ListAPIView):
+    """
+    API endpoint listing inventory below its reorder point
+    """
+    serializer_class = ReorderItemSerializer
+    projection = REORDER_ITEM_PROJECTION
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [QueryParamFilter]
+    query_filters = REORDER_FILTERS
+
+    def get_queryset(self):
+        return Inventory.objects.below_reorder_point().select_related('product__supplier').order_by('id')
+
+    @swagger_auto_schema(
+        operation_description="List inventory whose quantity is below the product's reorder point "
+                              "(or its supplier's default reorder point)",
+        manual_parameters=[
+            openapi.Parameter(
+                'supplier_id',
+                openapi.IN_QUERY,
+                description="Only list products of this supplier",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page',
+                openapi.IN_QUERY,
+                description="Page number",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Number of items per page",
+                type=openapi.TYPE_INTEGER
+            )
+        ],
+        responses={200: ReorderItemSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class InventoryBulkAdjustView(APIView):
+
+    @swagger_auto_schema(
+        operation_description="Apply many stock adjustments in one transaction. Each entry sets an "
+                              "absolute quantity or applies a delta; deltas are applied atomically in SQL",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                required=['product_id'],
+                properties={
+                    'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'delta': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'quantity': openapi.Schema(type=openapi.TYPE_INTEGER)
+                }
+            )
+        ),
+        responses={
+            200: openapi.Response(
+                description="Per-entry results, in request order",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'status': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'quantity': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'error': openapi.Schema(type=openapi.TYPE_STRING)
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: "Bad Request"
+        }
+    )
+    def post(self, request):
+        entries = request.data
+        if not isinstance(entries, list):
+            return Response(
+                {'error': 'Expected a list of adjustments'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(entries) > settings.INVENTORY_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.INVENTORY_BULK_MAX_ITEMS} adjustments per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = apply_stock_adjustments(entries)
+        except Exception as e:
+            return Response(
+                {'error': 'An unexpected error occurred: ' + str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
 class FileUploadView(APIView):
     parser_classes = (MultiPartParser,)
 
@@ -295,9 +819,12 @@ class FileUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        file_path = None
+        task_id = str(uuid.uuid4())
         try:
-            file_content = uploaded_file.read()
-            task = process_csv_file.delay(file_content)
+            file_path = spool_upload(uploaded_file)
+            ImportJob.objects.create(task_id=task_id, file_name=uploaded_file.name)
+            task = import_csv_file.apply_async(args=[file_path], task_id=task_id)
 
             return Response({
                 'message': 'File processing started',
@@ -305,7 +832,391 @@ class FileUploadView(APIView):
             }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
+            if file_path is not None and os.path.exists(file_path):
+                os.remove(file_path)
+            ImportJob.objects.filter(task_id=task_id).delete()
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class ImportJobDetailAPIView(generics.RetrieveAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    lookup_field = 'task_id'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['task_result'] = TaskResult.objects.filter(task_id=self.kwargs['task_id']).first()
+        return context
+
+    @swagger_auto_schema(
+        operation_description="Get the progress and result of a CSV import",
+        responses={
+            200: ImportJobSerializer(),
+            404: "Import job not found"
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ChangeFeedView(APIView):
+    """
+    Rows of ``resource`` changed since a watermark, plus the ids of deleted
+    rows, for clients that keep a local copy in sync.
+    """
+    resource = None
+
+    @swagger_auto_schema(
+        operation_description="List rows created or updated since a watermark and the ids of rows deleted "
+                              "since. Start without 'since', store the returned watermark and send it back "
+                              "as 'since' on the next sync; ask again straight away while has_more is true",
+        manual_parameters=[
+            openapi.Parameter(
+                'since',
+                openapi.IN_QUERY,
+                description="Watermark returned by the previous sync",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Maximum changed rows (and deleted ids) per response",
+                type=openapi.TYPE_INTEGER
+            ),
+            FIELDS_PARAMETER,
+            EXPAND_PARAMETER
+        ],
+        responses={
+            200: openapi.Response(
+                description="Changes since the watermark",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'changes': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                        'deleted': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                        'watermark': openapi.Schema(type=openapi.TYPE_STRING),
+                        'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN)
+                    }
+                )
+            ),
+            400: "Invalid watermark",
+            410: "Watermark expired; sync again without 'since'"
+        }
+    )
+    def get(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', changes.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            page_size = changes.DEFAULT_PAGE_SIZE
+        page_size = min(max(page_size, 1), changes.MAX_PAGE_SIZE)
+
+        _, projection = changes.FEEDS[self.resource]
+        try:
+            projection = projection.for_request(request, keep=changes.POSITION_FIELDS)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = changes.changes_since(self.resource, request.query_params.get('since'), page_size, projection)
+        except changes.WatermarkExpired:
+            return Response(
+                {'error': "Watermark expired, sync again without 'since'"},
+                status=status.HTTP_410_GONE
+            )
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return Response({'error': 'Invalid watermark'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+def parse_stock_query(request, *names):
+    """
+    The product and the timestamps ``names`` of a stock history request;
+    missing timestamps default to now. Raises ``ValueError``.
+    """
+    product_id = request.query_params.get('product_id')
+    if not product_id:
+        raise ValueError('product_id is required')
+    try:
+        product_id = int(product_id)
+    except ValueError:
+        raise ValueError(f'Invalid product_id: {product_id}')
+    times = []
+    for name in names:
+        value = request.query_params.get(name)
+        if not value:
+            times.append(timezone.now())
+            continue
+        try:
+            times.append(parse_timestamp(value))
+        except ValueError:
+            raise ValueError(f'Invalid {name}: {value}')
+    return product_id, times
+
+
+STOCK_PRODUCT_PARAMETER = openapi.Parameter(
+    'product_id',
+    openapi.IN_QUERY,
+    description="ID of the product",
+    type=openapi.TYPE_INTEGER,
+    required=True
+)
+
+
+class StockLevelView(APIView):
+    """
+    A product's stock as of a point in time, rebuilt from the stock ledger.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Get a product's quantity, and the running totals received and issued, "
+                              "as of a point in time",
+        manual_parameters=[
+            STOCK_PRODUCT_PARAMETER,
+            openapi.Parameter(
+                'at',
+                openapi.IN_QUERY,
+                description="ISO 8601 time; defaults to now",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Stock as of the requested time",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'quantity': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'received': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'issued': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            ),
+            400: "Bad Request",
+            404: "Product not found"
+        }
+    )
+    def get(self, request):
+        try:
+            product_id, (at,) = parse_stock_query(request, 'at')
+            if not Product.objects.filter(id=product_id).exists():
+                return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+            stock = ledger.stock_at(product_id, at)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'product_id': product_id, 'at': at, **stock}, status=status.HTTP_200_OK)
+
+
+class StockMovementView(APIView):
+    """
+    Stock received and issued for a product over a period, from the stock
+    ledger.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Get a product's opening and closing stock over a period and the quantities "
+                              "received and issued in between",
+        manual_parameters=[
+            STOCK_PRODUCT_PARAMETER,
+            openapi.Parameter(
+                'start',
+                openapi.IN_QUERY,
+                description="ISO 8601 start of the period",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME,
+                required=True
+            ),
+            openapi.Parameter(
+                'end',
+                openapi.IN_QUERY,
+                description="ISO 8601 end of the period; defaults to now",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Stock movement over the period",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'product_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'start': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'end': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        'opening': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'closing': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'received': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'issued': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'net': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            ),
+            400: "Bad Request",
+            404: "Product not found"
+        }
+    )
+    def get(self, request):
+        try:
+            if not request.query_params.get('start'):
+                raise ValueError('start is required')
+            product_id, (start, end) = parse_stock_query(request, 'start', 'end')
+            if not Product.objects.filter(id=product_id).exists():
+                return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+            movement = ledger.movement_between(product_id, start, end)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'product_id': product_id, 'start': start, 'end': end, **movement},
+            status=status.HTTP_200_OK
+        )
+
+
+class SupplierSummaryListView(generics.ListAPIView):
+    """
+    Stock aggregates per supplier, read from the precomputed summary table.
+    """
+    queryset = SupplierStockSummary.objects.select_related('supplier').order_by('id')
+    serializer_class = SupplierStockSummarySerializer
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [StableOrderingFilter]
+    ordering_fields = ['product_count', 'units', 'stock_value', 'below_reorder_point']
+    ordering = ['id']
+
+    @swagger_auto_schema(
+        operation_description="List each supplier's product count, units in stock, stock value and products "
+                              "below their reorder point. Figures are refreshed in the background; 'stale' "
+                              "rows have changes waiting for the next refresh",
+        manual_parameters=[
+            openapi.Parameter(
+                'page',
+                openapi.IN_QUERY,
+                description="Page number",
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                description="Number of items per page",
+                type=openapi.TYPE_INTEGER
+            ),
+            ordering_parameter(ordering_fields)
+        ],
+        responses={200: SupplierStockSummarySerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class SupplierSummaryDetailView(generics.RetrieveAPIView):
+    queryset = SupplierStockSummary.objects.select_related('supplier')
+    serializer_class = SupplierStockSummarySerializer
+    lookup_field = 'supplier_id'
+
+    @swagger_auto_schema(
+        operation_description="Get one supplier's stock aggregates",
+        responses={
+            200: SupplierStockSummarySerializer(),
+            404: openapi.Response(
+                description="Supplier summary not found",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'error': openapi.Schema(type=openapi.TYPE_STRING)
+                    }
+                )
+            )
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except Http404:
+            return Response(
+                {'error': 'Supplier summary not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+
+class StockReportView(APIView):
+    """
+    Stock totals across all suppliers, summed from the per-supplier
+    summaries rather than from the catalogue.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Get total products, units in stock, stock value and products below their "
+                              "reorder point across all suppliers",
+        responses={
+            200: openapi.Response(
+                description="Stock totals",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'suppliers': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'product_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'units': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'stock_value': openapi.Schema(type=openapi.TYPE_STRING),
+                        'below_reorder_point': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'stale_suppliers': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'refreshed_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME)
+                    }
+                )
+            )
+        }
+    )
+    def get(self, request):
+        totals = SupplierStockSummary.objects.aggregate(
+            suppliers=Count('id'),
+            product_count=Coalesce(Sum('product_count'), 0),
+            units=Coalesce(Sum('units'), 0),
+            stock_value=Coalesce(Sum('stock_value'), Value(Decimal('0')), output_field=DecimalField()),
+            below_reorder_point=Coalesce(Sum('below_reorder_point'), 0),
+            stale_suppliers=Count('id', filter=Q(stale=True)),
+            refreshed_at=Min('refreshed_at'),
+        )
+        totals['stock_value'] = f"{totals['stock_value']:.2f}"
+        return Response(totals, status=status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+
+    @swagger_auto_schema(
+        operation_description="Hit and miss counters of the API read cache",
+        responses={
+            200: openapi.Response(
+                description="Cache statistics",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'hits': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'misses': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'hit_ratio': openapi.Schema(type=openapi.TYPE_NUMBER)
+                    }
+                )
+            )
+        }
+    )
+    def get(self, request):
+        return Response(api_cache.stats(), status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+
+    @swagger_auto_schema(
+        operation_description="Per-view request and per-task Celery metrics in the Prometheus text exposition format",
+        responses={200: "Prometheus metrics"}
+    )
+    def get(self, request):
+        views = [name for name in get_resolver().reverse_dict if isinstance(name, str)]
+        views.append(UNMATCHED_VIEW)
+        tasks = metrics.task_names()
+        body = metrics.render(
+            [(metric, views) for metric in metrics.REQUEST_METRICS]
+            + [(metric, tasks) for metric in metrics.TASK_METRICS]
+        )
+        return HttpResponse(body, content_type=metrics.CONTENT_TYPE)
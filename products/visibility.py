@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+
+def oldest_open_write():
+    """
+    When the oldest transaction still holding uncommitted writes began, or
+    ``None`` if there is none or the database cannot tell. Only PostgreSQL
+    reports this; it needs the app's role to see its other sessions in
+    ``pg_stat_activity``, which it does when every process shares one role.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT min(xact_start) FROM pg_stat_activity '
+            'WHERE backend_xid IS NOT NULL AND datname = current_database() AND pid <> pg_backend_pid()'
+        )
+        return cursor.fetchone()[0]
+
+
+def committed_cutoff(window, now=None):
+    """
+    A time up to which every row stamped by the app (``auto_now`` and the
+    like) is committed: ``window`` seconds before ``now``, or before the
+    oldest open write transaction began if that is earlier. ``window``
+    absorbs clock skew between the app servers and the database. Where the
+    database cannot report open transactions it must also outlast the
+    longest write transaction, such as an import chunk.
+    """
+    now = now or timezone.now()
+    oldest = oldest_open_write()
+    if oldest is not None:
+        now = min(now, oldest)
+    return now - timedelta(seconds=window)